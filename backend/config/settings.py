@@ -27,6 +27,88 @@ DIXA_API_TOKEN = os.getenv("DIXA_API_TOKEN", "")
 ELEVIO_API_KEY = os.getenv("ELEVIO_API_KEY", "")
 ELEVIO_JWT = os.getenv("ELEVIO_JWT", "")
 
+# === DIXA SYNC ===
+DIXA_FULL_SYNC_START = os.getenv("DIXA_FULL_SYNC_START", "2025-01-01")
+DIXA_DEFAULT_LOOKBACK_DAYS = int(os.getenv("DIXA_DEFAULT_LOOKBACK_DAYS", "7"))
+DIXA_SYNC_OVERLAP_HOURS = int(os.getenv("DIXA_SYNC_OVERLAP_HOURS", "24"))
+DIXA_REQUESTS_PER_MINUTE = int(os.getenv("DIXA_REQUESTS_PER_MINUTE", "10"))
+DIXA_BURST = int(os.getenv("DIXA_BURST", "2"))
+DIXA_MAX_WORKERS = int(os.getenv("DIXA_MAX_WORKERS", "4"))
+
+# === EMBEDDINGS ===
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "16384"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "2048"))
+
+# === PREPROCESSING ===
+# n_process > 1 needs a non-daemonic worker (celery --pool=solo/threads) or
+# the preprocess_messages management command.
+PREPROCESS_N_PROCESS = int(os.getenv("PREPROCESS_N_PROCESS", "1"))
+PREPROCESS_BATCH_SIZE = int(os.getenv("PREPROCESS_BATCH_SIZE", "256"))
+PREPROCESS_CHUNK_SIZE = int(os.getenv("PREPROCESS_CHUNK_SIZE", "2000"))
+# Optional override of faq_api/data/boilerplate_phrases.txt
+BOILERPLATE_PHRASES_PATH = os.getenv("BOILERPLATE_PHRASES_PATH", "")
+# Languages whose spaCy models each Celery worker process loads at boot, e.g. "en,nl".
+# Every prefork child pays the load and holds the models in memory, so set this only
+# on the worker that runs preprocessing; elsewhere leave it empty and load lazily.
+SPACY_WARM_LANGUAGES = [l for l in os.getenv("SPACY_WARM_LANGUAGES", "").split(",") if l.strip()]
+
+# === LLM (Groq) ===
+# Budget shared by every worker through Redis; match the account's rate limits.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Persistent response cache for GPTFAQAnalyzer / SentimentAnalyzer prompts
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_DAYS = int(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200000"))
+
+# === CLUSTER PROMPTS ===
+# Representative messages per cluster (MMR over embeddings) shared by every
+# cluster-level prompt, up to this many cl100k tokens.
+CLUSTER_PROMPT_TOKEN_BUDGET = int(os.getenv("CLUSTER_PROMPT_TOKEN_BUDGET", "1500"))
+CLUSTER_SAMPLE_MMR_LAMBDA = float(os.getenv("CLUSTER_SAMPLE_MMR_LAMBDA", "0.7"))
+CLUSTER_SAMPLE_MAX_ITEM_TOKENS = int(os.getenv("CLUSTER_SAMPLE_MAX_ITEM_TOKENS", "200"))
+
+# === MATCHING ===
+# match_messages_task fans out one chunk task per MATCH_CHUNK_SIZE message ids
+MATCH_CHUNK_SIZE = int(os.getenv("MATCH_CHUNK_SIZE", "500"))
+
+# === FAQ RERANKING ===
+# Messages whose top FAQ candidate beats the runner-up by RERANK_MARGIN cosine
+# similarity skip the LLM; the rest are reranked in groups sharing one prompt.
+RERANK_MARGIN = float(os.getenv("RERANK_MARGIN", "0.05"))
+RERANK_GROUP_SIZE = int(os.getenv("RERANK_GROUP_SIZE", "15"))
+RERANK_PROMPT_TOKEN_BUDGET = int(os.getenv("RERANK_PROMPT_TOKEN_BUDGET", "5000"))
+RERANK_ANSWER_TOKENS = int(os.getenv("RERANK_ANSWER_TOKENS", "120"))
+
+# === RESOLUTION GATE ===
+# Resolution labels from FAQ similarity alone outside the ambiguous band.
+# Thresholds come from `manage.py calibrate_resolution_gate`; without a
+# calibration every message still goes to the LLM.
+RESOLUTION_GATE_ENABLED = os.getenv("RESOLUTION_GATE_ENABLED", "true").lower() == "true"
+RESOLUTION_GATE_TARGET_AGREEMENT = float(os.getenv("RESOLUTION_GATE_TARGET_AGREEMENT", "0.9"))
+RESOLUTION_GATE_MIN_SAMPLES = int(os.getenv("RESOLUTION_GATE_MIN_SAMPLES", "50"))
+
+# === SENTIMENT ===
+# Local CPU model tried before the LLM ("" = LLM only). Predictions below the
+# confidence gate are sent to the LLM.
+SENTIMENT_LOCAL_BACKEND = os.getenv(
+    "SENTIMENT_LOCAL_BACKEND", "faq_api.utils.local_sentiment.LexiconSentimentModel"
+)
+SENTIMENT_LOCAL_MIN_CONFIDENCE = float(os.getenv("SENTIMENT_LOCAL_MIN_CONFIDENCE", "0.6"))
+
+# === VECTOR SEARCH (pgvector) ===
+# Opt-in: `manage.py sync_vector_schema` adds halfvec columns (filled by
+# triggers) + HNSW indexes; it needs the pgvector extension >= 0.7 on the
+# server. Enable this flag only after running it. Without it nothing
+# vector-related exists in the schema and search runs in numpy.
+PGVECTOR_ENABLED = os.getenv("PGVECTOR_ENABLED", "false").lower() == "true"
+PGVECTOR_HNSW_EF_SEARCH = int(os.getenv("PGVECTOR_HNSW_EF_SEARCH", "64"))
+
 # === LOGIN Urls ===
 LOGIN_URL = "/accounts/login/"
 LOGIN_REDIRECT_URL = '/dashboard/' 
@@ -72,7 +154,9 @@ TEMPLATES = [
 CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
-CELERY_RESULT_BACKEND = None  
+# Chords (match_messages_task fan-out) need a result backend
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
+CELERY_RESULT_EXPIRES = int(os.getenv("CELERY_RESULT_EXPIRES", str(24 * 3600)))
 CELERY_TIMEZONE = "Europe/Amsterdam" 
 USE_TZ = True
 TIME_ZONE = "Europe/Amsterdam"
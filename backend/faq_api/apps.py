@@ -0,0 +1,9 @@
+#backend/faq_api/apps.py
+from django.apps import AppConfig
+
+
+class FaqApiConfig(AppConfig):
+    name = "faq_api"
+
+    def ready(self):
+        from faq_api import signals  # noqa: F401
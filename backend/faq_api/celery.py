@@ -2,6 +2,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
@@ -11,6 +12,16 @@ app.autodiscover_tasks()
 app.conf.enable_utc = False
 app.conf.timezone = 'Europe/Amsterdam'
 
+
+@worker_process_init.connect
+def warm_spacy_models(**kwargs):
+    """Load spaCy pipelines once per worker process instead of inside the first task."""
+    from django.conf import settings
+    from faq_api.utils.nlp_registry import warm
+
+    if settings.SPACY_WARM_LANGUAGES:
+        warm([lang.strip() for lang in settings.SPACY_WARM_LANGUAGES])
+
 # Celery Beat schedule
 app.conf.beat_schedule = {
     "weekly-download-job": {
@@ -0,0 +1,172 @@
+#backend/faq_api/management/commands/_stub_server.py
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubAPIServer:
+    """
+    Local stand-in for the external APIs the pipeline calls, used to
+    benchmark and exercise the HTTP clients without network access.
+    Injects a fixed latency per request and answers every
+    `rate_limit_every`-th request with a 429.
+
+    Serves:
+      POST /v1/embeddings           — Jina-style embeddings (deterministic per text)
+      GET  /v1/message_export       — Dixa-style message export for a date window
+      GET  /v1/conversation_export  — Dixa-style conversation export
+      POST /openai/v1/chat/completions — Groq-style chat completion; the answer
+                                       comes from chat_responder(messages)
+
+    Usage:
+        with StubAPIServer(latency=0.2, rate_limit_every=10) as stub:
+            Tokenizer(..., jina_url=stub.url("/v1/embeddings"))
+    """
+
+    def __init__(self, latency=0.1, rate_limit_every=0, retry_after=1, dim=32, export_rows=200,
+                 chat_responder=None, token_latency=0.0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.dim = dim
+        self.export_rows = export_rows
+        # chat latency grows with prompt + completion size, like a real LLM
+        self.chat_responder = chat_responder or (lambda messages: "Neutral")
+        self.token_latency = token_latency
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def url(self, path):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def _next_request(self):
+        """Count a request and decide whether it gets rate-limited."""
+        with self._lock:
+            self.requests += 1
+            limited = bool(self.rate_limit_every) and self.requests % self.rate_limit_every == 0
+            if limited:
+                self.rate_limited += 1
+            return limited
+
+    def fake_embedding(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [digest[i % len(digest)] / 255.0 for i in range(self.dim)]
+
+    def handle_embeddings(self, body):
+        inputs = body.get("input", [])
+        return {
+            "data": [
+                {"index": i, "embedding": self.fake_embedding(item.get("text", ""))}
+                for i, item in enumerate(inputs)
+            ]
+        }
+
+    def handle_export(self, path, params):
+        window = f"{params.get('created_after', [''])[0]}_{params.get('created_before', [''])[0]}"
+        kind = "conv" if "conversation" in path else "msg"
+        return {
+            "data": [
+                {
+                    "id": f"{kind}-{window}-{i}",
+                    "csid": i,
+                    "text": f"Stub message {i} for {window}",
+                    "created_at": 1735689600000 + i * 1000,
+                    "direction": "inbound",
+                }
+                for i in range(self.export_rows)
+            ]
+        }
+
+    def handle_chat(self, body):
+        messages = body.get("messages", [])
+        content = self.chat_responder(messages)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        time.sleep((prompt_tokens + completion_tokens) * self.token_latency)
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload, headers=None):
+                raw = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def _dispatch(self, body):
+                time.sleep(stub.latency)
+                if stub._next_request():
+                    self._send(429, {"detail": "rate limited"}, {"Retry-After": str(stub.retry_after)})
+                    return
+                parsed = urlparse(self.path)
+                if parsed.path.startswith("/v1/embeddings"):
+                    self._send(200, stub.handle_embeddings(body))
+                elif parsed.path.endswith("/chat/completions"):
+                    self._send(200, stub.handle_chat(body))
+                elif parsed.path.endswith("_export"):
+                    self._send(200, stub.handle_export(parsed.path, parse_qs(parsed.query)))
+                else:
+                    self._send(404, {"detail": "not found"})
+
+            def do_GET(self):
+                self._dispatch({})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                self._dispatch(body)
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,50 @@
+#backend/faq_api/management/commands/benchmark_boilerplate.py
+import random
+import re
+import time
+from django.core.management.base import BaseCommand
+from faq_api.utils.boilerplate import BoilerplateStripper, load_phrases
+
+WORDS = (
+    "order payment refund seller buyer shipping delivery account item listing "
+    "bericht bestelling verkoper koper levering advertentie betaling dank graag "
+    "please message customer service confirmation automatic reply received"
+).split()
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-message boilerplate stripping cost as the phrase count grows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--counts", type=int, nargs="+", default=[50, 100, 200, 400, 800])
+        parser.add_argument("--messages", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        base = load_phrases()
+        messages = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80))) + " " + rng.choice(base)
+            for _ in range(options["messages"])
+        ]
+
+        self.stdout.write(f"{'phrases':>8} {'legacy µs/msg':>14} {'compiled µs/msg':>16}")
+        for count in options["counts"]:
+            phrases = list(base)
+            while len(phrases) < count:
+                phrases.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))))
+
+            # Legacy approach: one re.sub per phrase
+            legacy = [r"\b" + re.escape(p) + r"\b" for p in phrases]
+            start = time.perf_counter()
+            for text in messages:
+                for pattern in legacy:
+                    text = re.sub(pattern, "", text, flags=re.IGNORECASE)
+            legacy_us = (time.perf_counter() - start) / len(messages) * 1e6
+
+            stripper = BoilerplateStripper(phrases)
+            start = time.perf_counter()
+            for text in messages:
+                stripper.strip(text)
+            compiled_us = (time.perf_counter() - start) / len(messages) * 1e6
+
+            self.stdout.write(f"{len(phrases):>8} {legacy_us:>14.1f} {compiled_us:>16.1f}")
@@ -0,0 +1,115 @@
+#backend/faq_api/management/commands/benchmark_cluster_analysis.py
+import json
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from faq_api.utils.cluster_sampling import select_representatives
+from faq_api.utils.gpt import GPTFAQAnalyzer
+from faq_api.utils.llm_scheduler import LLMBudget, LLMScheduler, set_scheduler
+from faq_api.management.commands._stub_server import StubAPIServer
+
+
+def stub_responder(partial_every):
+    """Canned answers per prompt type; every partial_every-th combined answer drops fields."""
+    combined_calls = [0]
+
+    def respond(messages):
+        prompt = messages[-1]["content"]
+        if "exactly these fields" in prompt:
+            combined_calls[0] += 1
+            answer = {
+                "label": "Partially covered",
+                "score": "3",
+                "reason": "The FAQ explains tracking but not delays.",
+                "sentiment": "NEGATIVE",
+                "summary": "Customers ask why their delivery is late and where the parcel is.",
+                "topic_label": "\"Shipping Delay\"",
+                "faq_suggestion": {"question": "Why is my parcel late?", "answer": "Check the tracking page."},
+            }
+            if partial_every and combined_calls[0] % partial_every == 0:
+                answer.pop("summary")
+                answer["faq_suggestion"] = None
+            return json.dumps(answer)
+        if "Evaluate the resolution quality" in prompt:
+            return json.dumps({"label": "Partially", "score": 3, "reason": "Covers tracking only."})
+        if "Suggest a better FAQ" in prompt:
+            return json.dumps({"question": "Why is my parcel late?", "answer": "Check the tracking page."})
+        if "label the topic" in prompt:
+            return "Shipping Delay"
+        if "Summarize the key topic" in prompt:
+            return "Customers ask why their delivery is late and where the parcel is."
+        return "Negative"
+
+    return respond
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare five separate LLM calls per cluster with the combined analyze_cluster call "
+        "on a token-budgeted sample (stub server)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clusters", type=int, default=10)
+        parser.add_argument("--messages", type=int, default=40, help="Messages per cluster")
+        parser.add_argument("--latency", type=float, default=0.3, help="Stub base latency per request (s)")
+        parser.add_argument("--token-latency", type=float, default=0.0005, help="Stub latency per token (s)")
+        parser.add_argument("--partial-every", type=int, default=4, help="Every Nth combined answer drops fields (0 = never)")
+
+    def run(self, mode, clusters, options):
+        with StubAPIServer(
+            latency=options["latency"],
+            token_latency=options["token_latency"],
+            chat_responder=stub_responder(options["partial_every"]),
+        ) as stub:
+            gpt = GPTFAQAnalyzer(groq_api_key="stub", use_cache=False, base_url=stub.url(""))
+            start = time.perf_counter()
+            fallbacks = 0
+            for items in clusters:
+                top_message = items[0]["text"]
+                if mode == "separate":
+                    score = gpt.score_resolution(top_message, "How do I track my order?")
+                    if score.get("label") in ["Not", "Partially"]:
+                        gpt.suggest_faq(top_message)
+                    gpt.get_sentiment(top_message)
+                    gpt.summarize_cluster(items)
+                    gpt.label_topic(items)
+                else:
+                    sample = select_representatives(items)
+                    result = gpt.analyze_cluster(sample, "How do I track my order?", "Use the tracking link.")
+                    fallbacks += len(result["fallbacks"])
+            elapsed = time.perf_counter() - start
+
+        n = len(clusters)
+        self.stdout.write(
+            f"{mode:<9} calls/cluster={stub.requests / n:.1f} "
+            f"prompt_tokens/cluster={stub.prompt_tokens / n:.0f} "
+            f"completion_tokens/cluster={stub.completion_tokens / n:.0f} "
+            f"latency/cluster={elapsed / n:.2f}s fallback_fields={fallbacks}"
+        )
+        return elapsed, stub.prompt_tokens + stub.completion_tokens
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        clusters = [
+            [
+                {
+                    "text": f"Hi, my order {c}-{i} still has not arrived after ten days, where is my parcel? "
+                            f"The tracking page has not updated since last week.",
+                    "embedding": rng.normal(size=32).tolist(),
+                }
+                for i in range(options["messages"])
+            ]
+            for c in range(options["clusters"])
+        ]
+        # Unthrottled scheduler, and sentiment always from the LLM so both modes make the same calls
+        set_scheduler(LLMScheduler(LLMBudget(10**6, 10**9), max_concurrency=4))
+        with override_settings(SENTIMENT_LOCAL_BACKEND=""):
+            separate_time, separate_tokens = self.run("separate", clusters, options)
+            combined_time, combined_tokens = self.run("combined", clusters, options)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Combined call: {separate_time / combined_time:.1f}x faster per cluster, "
+            f"{1 - combined_tokens / separate_tokens:.0%} fewer tokens"
+        ))
@@ -0,0 +1,122 @@
+#backend/faq_api/management/commands/benchmark_dixa.py
+import datetime
+import os
+import shutil
+import tempfile
+import time
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from faq_api.utils.dixa_downloader import DixaDownloader
+from faq_api.management.commands._stub_server import StubAPIServer
+
+
+class LegacyDixaDownloader(DixaDownloader):
+    """
+    The download path as it was before the token bucket: one request per
+    window and endpoint, in sequence, no retries, and fixed sleeps of 6s
+    after conversations and 20s after messages.
+    """
+
+    def fetch_data(self, url, start, end):
+        params = {
+            "created_after": start.strftime("%Y-%m-%d"),
+            "created_before": end.strftime("%Y-%m-%d")
+        }
+        response = requests.get(url, headers=self.headers, params=params)
+        if response.status_code != 200:
+            print(f"Failed: {response.status_code} - {response.text}")
+            return []
+        result = response.json()
+        return result.get("data", []) if isinstance(result, dict) else result
+
+    def download_all_dixa_data(self):
+        self.setup_output_directory()
+        all_messages, all_conversations = [], []
+        for start, end in self.daterange():
+            conv_data = self.fetch_data(self.conversations_url, start, end)
+            all_conversations.extend(conv_data)
+            self.save_json(os.path.join(self.output_dir, f"conversations_{start}_{end}.json"), conv_data)
+            time.sleep(6)
+
+            msg_data = self.fetch_data(self.messages_url, start, end)
+            all_messages.extend(msg_data)
+            self.save_json(os.path.join(self.output_dir, f"messages_{start}_{end}.json"), msg_data)
+            time.sleep(20)
+        return all_messages, all_conversations
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark a Dixa backfill (both export endpoints) against a local stub server: "
+        "the legacy fixed-sleep downloader versus the rate-limited parallel one"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=28, help="Width of the backfill in days (legacy costs 26s per window)")
+        parser.add_argument("--step-days", type=int, default=7)
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+        parser.add_argument("--rpm", type=int, default=settings.DIXA_REQUESTS_PER_MINUTE, help="Rate limit (default: DIXA_REQUESTS_PER_MINUTE)")
+        parser.add_argument("--burst", type=int, default=settings.DIXA_BURST, help="Token bucket burst (default: DIXA_BURST)")
+        parser.add_argument("--latency", type=float, default=0.5, help="Stub latency per request (s)")
+        parser.add_argument("--rate-limit-every", type=int, default=10, help="Every Nth request gets a 429 (0 = never)")
+        parser.add_argument("--skip-legacy", action="store_true", help="Do not time the legacy downloader")
+        parser.add_argument("--output", help="Directory for the downloaded JSON (default: a temporary directory, removed afterwards)")
+
+    def run(self, downloader_cls, options, output_dir, **kwargs):
+        end = datetime.datetime(2025, 7, 1)
+        with StubAPIServer(
+            latency=options["latency"],
+            rate_limit_every=options["rate_limit_every"],
+            retry_after=1,
+        ) as stub:
+            dixa = downloader_cls(
+                api_token="stub",
+                start_date=end - datetime.timedelta(days=options["days"]),
+                end_date=end,
+                step=datetime.timedelta(days=options["step_days"]),
+                conversations_url=stub.url("/v1/conversation_export"),
+                messages_url=stub.url("/v1/message_export"),
+                **kwargs,
+            )
+            dixa.output_dir = output_dir
+
+            began = time.perf_counter()
+            messages, conversations = dixa.download_all_dixa_data()
+            elapsed = time.perf_counter() - began
+        return elapsed, len(messages), len(conversations), stub
+
+    def handle(self, *args, **options):
+        output = options["output"] or tempfile.mkdtemp(prefix="dixa_benchmark_")
+        windows = -(-options["days"] // options["step_days"])
+        self.stdout.write(
+            f"{windows} windows × 2 endpoints | rate limit {options['rpm']}/min, burst {options['burst']} | output: {output}"
+        )
+
+        try:
+            legacy = None
+            if not options["skip_legacy"]:
+                legacy, n_msg, n_conv, stub = self.run(LegacyDixaDownloader, options, os.path.join(output, "legacy"))
+                lost = " (those windows are lost, no retry)" if stub.rate_limited else ""
+                self.stdout.write(
+                    f"legacy      messages={n_msg} conversations={n_conv} requests={stub.requests} "
+                    f"429s={stub.rate_limited}{lost} time={legacy:.2f}s"
+                )
+
+            for workers in options["workers"]:
+                elapsed, n_msg, n_conv, stub = self.run(
+                    DixaDownloader,
+                    options,
+                    os.path.join(output, f"workers_{workers}"),
+                    requests_per_minute=options["rpm"],
+                    burst=options["burst"],
+                    max_workers=workers,
+                )
+                speedup = f" (speedup vs legacy: {legacy / elapsed:.1f}×)" if legacy else ""
+                self.stdout.write(
+                    f"workers={workers:<3} messages={n_msg} conversations={n_conv} requests={stub.requests} "
+                    f"429s={stub.rate_limited} time={elapsed:.2f}s{speedup}"
+                )
+        finally:
+            if not options["output"]:
+                shutil.rmtree(output, ignore_errors=True)
@@ -0,0 +1,49 @@
+#backend/faq_api/management/commands/benchmark_embedding.py
+import time
+from django.core.management.base import BaseCommand
+from faq_api.utils.embedding import Tokenizer
+from faq_api.management.commands._stub_server import StubAPIServer
+
+
+class Command(BaseCommand):
+    help = "Benchmark the concurrent embedding client against a local stub server"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--texts", type=int, default=2000, help="Number of texts to embed")
+        parser.add_argument("--batch-size", type=int, default=64)
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+        parser.add_argument("--latency", type=float, default=0.2, help="Stub latency per request (s)")
+        parser.add_argument("--rate-limit-every", type=int, default=15, help="Every Nth request gets a 429 (0 = never)")
+
+    def handle(self, *args, **options):
+        texts = [f"Where is my order number {i}? It has not arrived yet." for i in range(options["texts"])]
+
+        for concurrency in options["concurrency"]:
+            with StubAPIServer(
+                latency=options["latency"],
+                rate_limit_every=options["rate_limit_every"],
+                retry_after=0.5,
+            ) as stub:
+                tokenizer = Tokenizer(
+                    messages_path=None,
+                    jina_api_key="stub",
+                    batch_size=options["batch_size"],
+                    concurrency=concurrency,
+                    jina_url=stub.url("/v1/embeddings"),
+                    use_cache=False,
+                )
+                items = [(i, *tokenizer.prepare_text(t)) for i, t in enumerate(texts)]
+
+                start = time.perf_counter()
+                embedded = failed = 0
+                for _, results, batch_failed in tokenizer.embed_batches(items):
+                    embedded += len(results)
+                    failed += len(batch_failed)
+                elapsed = time.perf_counter() - start
+                tokenizer.client.close()
+
+            self.stdout.write(
+                f"concurrency={concurrency:<3} embedded={embedded} failed={failed} "
+                f"requests={stub.requests} 429s={stub.rate_limited} "
+                f"time={elapsed:.2f}s ({embedded / elapsed:.0f} texts/s)"
+            )
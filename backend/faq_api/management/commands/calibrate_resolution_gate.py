@@ -0,0 +1,47 @@
+#backend/faq_api/management/commands/calibrate_resolution_gate.py
+from django.core.management.base import BaseCommand
+from faq_api.utils.faq_index import get_faq_index
+from faq_api.utils.resolution_gate import calibrate
+
+
+class Command(BaseCommand):
+    help = (
+        "Fit the similarity thresholds of the resolution gate against stored gpt_label values "
+        "and report agreement and LLM calls saved"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target-agreement", type=float, help="Minimum agreement with the LLM label per band (default: settings)")
+        parser.add_argument("--min-samples", type=int, help="Minimum messages per gated band (default: settings)")
+        parser.add_argument("--holdout", type=float, default=0.0, help="Fraction of messages left out of the fit and used for the report")
+        parser.add_argument("--limit", type=int, help="Use at most this many labelled messages")
+        parser.add_argument("--dry-run", action="store_true", help="Report only; do not store the calibration")
+
+    def handle(self, *args, **options):
+        report = calibrate(
+            get_faq_index(refresh=True),
+            target_agreement=options["target_agreement"],
+            min_samples=options["min_samples"],
+            holdout=options["holdout"],
+            limit=options["limit"],
+            save=not options["dry_run"],
+        )
+        if not report["samples"] and not options["holdout"]:
+            self.stdout.write(self.style.WARNING("⚠️ No LLM-labelled matches to calibrate against"))
+            return
+
+        self.stdout.write(f"Labelled matches: {report['label_counts']}")
+        self.stdout.write(
+            f"High threshold: {report['high_threshold']} (score {report['high_score']}) | "
+            f"low threshold: {report['low_threshold']} (score {report['low_score']})"
+        )
+        scope = f"holdout of {report['samples']}" if options["holdout"] else f"{report['samples']} messages"
+        self.stdout.write(
+            f"On {scope}: gated {report['gated_high']} Fully + {report['gated_low']} Not covered, "
+            f"agreement {report['agreement']} | LLM calls saved: {report['llm_calls_saved']} "
+            f"({report['gated_fraction']:.1%})"
+        )
+        if report["calibration"] is not None:
+            self.stdout.write(self.style.SUCCESS(f"✅ Stored calibration #{report['calibration'].pk}"))
+        else:
+            self.stdout.write("Dry run — calibration not stored")
@@ -1,13 +1,20 @@
 #backend/faq_api/management/commands/download_dixa_elevio.py
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from faq_api.utils.dixa_downloader import DixaDownloader
 from faq_api.utils.elevio_downloader import ElevioFAQDownloader
+from faq_api.utils.message_ingest import MessageIngestor
+from faq_api.utils.sync_state import DIXA_MESSAGES_CURSOR, checkpoint, full_sync_start, sync_start
 import os
 import datetime
 
 class Command(BaseCommand):
     help = 'Download messages from Dixa and FAQs from Elevio'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--save-json', action='store_true', help='Also write each Dixa range to dixa_data/')
+        parser.add_argument('--full', action='store_true', help='Ignore the sync cursor and re-sync from DIXA_FULL_SYNC_START')
+
     def handle(self, *args, **kwargs):
         print("🚀 Running Dixa + Elevio downloader...")
 
@@ -19,12 +26,26 @@ class Command(BaseCommand):
             print("❌ Missing API credentials in environment variables.")
             return
 
+        start_date = sync_start(DIXA_MESSAGES_CURSOR, default_start=full_sync_start(), full=kwargs['full'])
+        print(f"📅 Syncing Dixa messages since {start_date}")
+
         dixa = DixaDownloader(
             api_token=dixa_token,
-            start_date=datetime.datetime(2025, 1, 1),
+            start_date=start_date,
+            requests_per_minute=settings.DIXA_REQUESTS_PER_MINUTE,
+            burst=settings.DIXA_BURST,
+            max_workers=settings.DIXA_MAX_WORKERS,
             end_date=datetime.datetime.now()
         )
-        dixa.download_all_dixa_data()
+        ingestor = MessageIngestor()
+        stats = ingestor.ingest(dixa.iter_messages(save_json=kwargs['save_json']))
+        checkpoint(
+            DIXA_MESSAGES_CURSOR,
+            ingestor.max_created_at,
+            failed_windows_start=dixa.first_failed_start(dixa.messages_url),
+            failed_rows=ingestor.failed_created_at,
+        )
+        print(f"📥 Dixa ingest: {stats}")
 
         elevio = ElevioFAQDownloader(api_key=elevio_key, jwt=elevio_jwt)
         elevio.download_all_faqs()
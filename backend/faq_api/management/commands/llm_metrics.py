@@ -0,0 +1,32 @@
+#backend/faq_api/management/commands/llm_metrics.py
+import json
+import time
+from django.core.management.base import BaseCommand
+from faq_api.utils.llm_scheduler import METRICS_KEY, get_scheduler
+
+
+class Command(BaseCommand):
+    help = "Show the shared LLM budget usage and the last published scheduler metrics of every worker"
+
+    def handle(self, *args, **options):
+        scheduler = get_scheduler()
+        budget = scheduler.budget
+        usage = budget.usage()
+        self.stdout.write(
+            f"Budget this minute: {usage['requests']}/{budget.requests_per_minute} requests, "
+            f"{usage['tokens']}/{budget.tokens_per_minute} tokens"
+        )
+
+        if budget.redis is None:
+            self.stdout.write(self.style.WARNING("⚠️ Redis unavailable — no worker metrics to show"))
+            return
+
+        snapshots = budget.redis.hgetall(METRICS_KEY)
+        if not snapshots:
+            self.stdout.write("No worker has published metrics yet")
+            return
+
+        for worker, raw in sorted(snapshots.items()):
+            data = json.loads(raw)
+            age = round(time.time() - data.pop("updated", time.time()))
+            self.stdout.write(f"{worker.decode() if isinstance(worker, bytes) else worker} ({age}s ago): {data}")
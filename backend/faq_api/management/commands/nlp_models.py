@@ -0,0 +1,22 @@
+#backend/faq_api/management/commands/nlp_models.py
+from django.core.management.base import BaseCommand
+from faq_api.utils.nlp_registry import SPACY_MODELS, warm
+
+
+class Command(BaseCommand):
+    help = "Load the spaCy models used for anonymization and report load time and memory per process"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lang", action="append", choices=sorted(SPACY_MODELS), help="Language to load (repeatable, default: all)")
+
+    def handle(self, *args, **options):
+        report = warm(options["lang"])
+        for lang, stats in report["models"].items():
+            self.stdout.write(
+                f"{lang}: {stats['model']} | pipes={','.join(stats['pipes'])} | "
+                f"{stats['load_seconds']}s | +{stats['rss_delta_mb']} MB"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Process {report['pid']} RSS: {report['rss_mb']} MB — "
+            f"multiply by worker concurrency to size the host"
+        ))
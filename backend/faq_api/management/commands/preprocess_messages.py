@@ -0,0 +1,27 @@
+#backend/faq_api/management/commands/preprocess_messages.py
+import time
+from django.core.management.base import BaseCommand
+from faq_api.utils.preprocess_pipeline import run_preprocessing
+
+
+class Command(BaseCommand):
+    help = "Anonymize stored messages with the batched, multi-process preprocessing engine"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Reprocess every message, not only new/outdated ones")
+        parser.add_argument("--n-process", type=int, default=None, help="Worker processes (default: PREPROCESS_N_PROCESS)")
+        parser.add_argument("--batch-size", type=int, default=None, help="nlp.pipe batch size")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Messages loaded and written per chunk")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        processed, cleaned = run_preprocessing(
+            force=options["force"],
+            chunk_size=options["chunk_size"],
+            n_process=options["n_process"],
+            batch_size=options["batch_size"],
+        )
+        duration = round(time.time() - start, 2)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Preprocessed {processed} messages in {duration}s | Cleaned: {cleaned}"
+        ))
@@ -0,0 +1,35 @@
+#backend/faq_api/management/commands/sync_vector_schema.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from faq_api.utils.vector_store import MIN_PGVECTOR_VERSION, drop_vector_schema, install_vector_schema, pgvector_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Opt in to pgvector search: add halfvec embedding columns (kept in sync by triggers) "
+        "with HNSW indexes and backfill them. Set PGVECTOR_ENABLED=true afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drop", action="store_true", help="Remove the vector columns, triggers and indexes")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("pgvector search needs a PostgreSQL database")
+
+        if options["drop"]:
+            drop_vector_schema()
+            self.stdout.write(self.style.SUCCESS("✅ Vector columns, triggers and indexes removed."))
+            return
+
+        version = pgvector_version()
+        if version is None:
+            raise CommandError("The pgvector extension is not available on this database server")
+        if version < MIN_PGVECTOR_VERSION:
+            raise CommandError(
+                f"pgvector {'.'.join(map(str, version))} is too old; halfvec needs "
+                f"{'.'.join(map(str, MIN_PGVECTOR_VERSION))} or newer"
+            )
+
+        install_vector_schema()
+        self.stdout.write(self.style.SUCCESS("✅ Vector columns, triggers and HNSW indexes installed and backfilled."))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2025-07-28 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("faq_api", "0004_embeddingcacheentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
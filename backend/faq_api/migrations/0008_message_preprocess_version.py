@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2025-08-05 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("faq_api", "0007_synccursor"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="preprocess_version",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="preprocessed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
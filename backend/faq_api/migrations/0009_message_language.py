@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2025-08-05 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("faq_api", "0008_message_preprocess_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="language",
+            field=models.CharField(blank=True, db_index=True, max_length=8, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2025-08-08 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("faq_api", "0010_llmcacheentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResolutionGateCalibration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("high_threshold", models.FloatField(blank=True, null=True)),
+                ("low_threshold", models.FloatField(blank=True, null=True)),
+                ("high_score", models.IntegerField(blank=True, null=True)),
+                ("low_score", models.IntegerField(blank=True, null=True)),
+                ("target_agreement", models.FloatField()),
+                ("sample_size", models.IntegerField()),
+                ("agreement", models.FloatField(blank=True, null=True)),
+                ("gated_fraction", models.FloatField(default=0.0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2025-08-08 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("faq_api", "0011_resolutiongatecalibration"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="matched_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -42,6 +42,13 @@ class Message(models.Model):
     chat_input_answer = models.TextField(null=True, blank=True)
     chat_menu_text = models.TextField(null=True, blank=True)
     form_submission = models.JSONField(null=True, blank=True)
+    # sha256 of the exported row, used to skip unchanged rows on re-ingest
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
+    # MessagePreprocessor.config_version the text was last anonymized with
+    preprocess_version = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    preprocessed_at = models.DateTimeField(null=True, blank=True)
+    # ISO 639-1 code detected during preprocessing, reused instead of re-detecting
+    language = models.CharField(max_length=8, null=True, blank=True, db_index=True)
 
     embedding = ArrayField(models.FloatField(), null=True, blank=True)
     #embedding_updated_at = models.DateTimeField(null=True, blank=True)
@@ -54,6 +61,8 @@ class Message(models.Model):
     matched_faq = models.ForeignKey(
         FAQ, null=True, blank=True, on_delete=models.SET_NULL, related_name="matched_messages"
     )
+    # When match_messages_chunk_task last wrote sentiment / FAQ match / resolution
+    matched_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     def __str__(self):
         return self.message_id
@@ -106,3 +115,61 @@ class ClusterResultMessage(models.Model):
     cluster_result = models.ForeignKey(ClusterResult, on_delete=models.CASCADE)
     message = models.ForeignKey(Message, to_field="message_id", on_delete=models.CASCADE)
 
+
+
+class EmbeddingCacheEntry(models.Model):
+    """Content-addressed embedding, keyed by (model, task, max_tokens, text hash)."""
+    key = models.CharField(max_length=64, primary_key=True)
+    model = models.CharField(max_length=100)
+    embedding = ArrayField(models.FloatField())
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.model}:{self.key[:12]}"
+
+
+class LLMCacheEntry(models.Model):
+    """Cached chat completion text, keyed by (model, prompt template + version, normalized request)."""
+    key = models.CharField(max_length=64, primary_key=True)
+    model = models.CharField(max_length=100)
+    template = models.CharField(max_length=100, db_index=True)
+    response = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.template}:{self.key[:12]}"
+
+
+class SyncCursor(models.Model):
+    """High-water mark of an incremental sync (e.g. last Dixa created_at seen)."""
+    name = models.CharField(max_length=100, primary_key=True)
+    position = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class ResolutionGateCalibration(models.Model):
+    """
+    Similarity thresholds fitted against stored gpt_label values: matches at
+    or above high_threshold are labelled Fully covered and at or below
+    low_threshold Not covered without an LLM call. A null threshold disables
+    that side of the gate.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    high_threshold = models.FloatField(null=True, blank=True)
+    low_threshold = models.FloatField(null=True, blank=True)
+    high_score = models.IntegerField(null=True, blank=True)
+    low_score = models.IntegerField(null=True, blank=True)
+    target_agreement = models.FloatField()
+    sample_size = models.IntegerField()
+    agreement = models.FloatField(null=True, blank=True)
+    gated_fraction = models.FloatField(default=0.0)
+
+    def __str__(self):
+        return f"Gate {self.created_at:%Y-%m-%d %H:%M}: <{self.low_threshold} / >={self.high_threshold}"
+
@@ -0,0 +1,11 @@
+#backend/faq_api/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from faq_api.models import FAQ
+from faq_api.utils.faq_index import invalidate_faq_index
+
+
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+def faq_changed(sender, **kwargs):
+    invalidate_faq_index()
@@ -4,17 +4,29 @@ import json
 import time
 import datetime
 import tempfile
-from celery import shared_task, chain
-from django.utils.timezone import make_aware, now
+from celery import shared_task, chain, chord
+from django.conf import settings
+from django.utils.timezone import now
 from django.core.cache import cache
-from faq_api.models import Message, FAQ, ClusterResult, ClusterRun
+from django.db import transaction
+from django.db.models import Q
+from faq_api.models import Message, FAQ, ClusterResult, ClusterRun, SyncCursor
 from faq_api.utils.dixa_downloader import DixaDownloader
 from faq_api.utils.elevio_downloader import ElevioFAQDownloader
 from faq_api.utils.embedding import Tokenizer
+from faq_api.utils.message_ingest import MessageIngestor
+from faq_api.utils.sync_state import DIXA_MESSAGES_CURSOR, checkpoint, sync_start
 from faq_api.utils.sentiment import SentimentAnalyzer
 from faq_api.utils.gpt import GPTFAQAnalyzer
-from faq_api.utils.faq_matcher import find_top_faqs, rerank_with_gpt
-from faq_api.utils.preprocess import MessagePreprocessor
+from faq_api.utils.faq_matcher import FAQReranker
+from faq_api.utils.faq_index import get_faq_index, invalidate_faq_index
+from faq_api.utils.llm_cache import LLMResponseCache
+from faq_api.utils.llm_scheduler import get_scheduler
+from faq_api.utils.preprocess_pipeline import run_preprocessing
+from faq_api.utils.rate_limit import backoff_delay
+from faq_api.utils.resolution_gate import ResolutionGate
+from faq_api.utils.vector_store import nearest_faqs, nearest_faqs_batch
+from faq_api.utils import nlp_registry
 from faq_api.utils.clustering_pipeline import run_clustering_and_save
 from faq_api.serializers import ClusterResultSerializer
 from datetime import timedelta
@@ -22,6 +34,10 @@ import collections
 import json
 import re
 
+MATCH_FIELDS = ["sentiment", "gpt_label", "gpt_score", "gpt_reason", "matched_faq", "matched_at"]
+MATCH_WRITE_BATCH = 500
+MATCH_FORCE_CURSOR = "match_messages_force"
+
 
 def setup_google_credentials_from_env():
     raw = os.getenv("GOOGLE_CREDENTIALS_JSON")
@@ -36,7 +52,7 @@ def setup_google_credentials_from_env():
 
 
 @shared_task
-def download_dixa_task():
+def download_dixa_task(full_resync=False):
     print("🚀 Starting task: download_dixa_task")
     start = time.time()
 
@@ -44,57 +60,41 @@ def download_dixa_task():
     if not dixa_token:
         raise Exception("Missing DIXA_API_TOKEN")
     end_date = datetime.datetime.now()
-    start_date = end_date - datetime.timedelta(days=7) #Downloading 7 days of Dixa messages
+    # Only fetch what is newer than the stored high-water mark (minus overlap)
+    start_date = sync_start(
+        DIXA_MESSAGES_CURSOR,
+        default_start=end_date - datetime.timedelta(days=settings.DIXA_DEFAULT_LOOKBACK_DAYS),
+        full=full_resync,
+    )
+    print(f"📅 Syncing Dixa messages from {start_date} to {end_date} (full_resync={full_resync})")
 
     dixa = DixaDownloader(
         api_token=dixa_token,
         start_date=start_date,
+        requests_per_minute=settings.DIXA_REQUESTS_PER_MINUTE,
+        burst=settings.DIXA_BURST,
+        max_workers=settings.DIXA_MAX_WORKERS,
         end_date=end_date
     )
-    messages, _ = dixa.download_all_dixa_data()
-    inserted = 0
-
-    for msg in messages:
-        msg_id = msg.get("id")
-        text = msg.get("text")
-        if not msg_id or not text:
-            continue
-        created_at = make_aware(datetime.datetime.fromtimestamp(msg["created_at"] / 1000)) if msg.get("created_at") else None
-
-        try:
-            Message.objects.update_or_create(
-                message_id=msg_id,
-                defaults={
-                    "csid": msg.get("csid"),
-                    "created_at": created_at,
-                    "author_name": msg.get("author_name"),
-                    "author_email": msg.get("author_email"),
-                    "direction": msg.get("direction"),
-                    "text": text,
-                    "from_phone_number": msg.get("from_phone_number"),
-                    "to_phone_number": msg.get("to_phone_number"),
-                    "duration": msg.get("duration"),
-                    "to": msg.get("to"),
-                    "from_field": msg.get("from"),
-                    "cc": msg.get("cc"),
-                    "bcc": msg.get("bcc"),
-                    "is_automated_message": msg.get("is_automated_message"),
-                    "voicemail_url": msg.get("voicemail_url"),
-                    "recording_url": msg.get("recording_url"),
-                    "attached_files": msg.get("attached_files"),
-                    "chat_input_question": msg.get("chat_input_question"),
-                    "chat_input_answer": msg.get("chat_input_answer"),
-                    "chat_menu_text": msg.get("chat_menu_text"),
-                    "form_submission": msg.get("formSubmission"),
-                }
-            )
-            inserted += 1
-        except Exception as e:
-            print(f"❌ Failed to insert message {msg_id}: {e}")
+    ingestor = MessageIngestor()
+    stats = ingestor.ingest(dixa.iter_messages())
+    checkpoint(
+        DIXA_MESSAGES_CURSOR,
+        ingestor.max_created_at,
+        failed_windows_start=dixa.first_failed_start(dixa.messages_url),
+        failed_rows=ingestor.failed_created_at,
+    )
 
     duration = round(time.time() - start, 2)
-    print(f"✅ Finished task: download_dixa_task in {duration}s | Inserted: {inserted}")
-    return {"message_count": inserted}
+    print(
+        f"✅ Finished task: download_dixa_task in {duration}s | "
+        f"Inserted: {stats['inserted']} | Updated: {stats['updated']} | Unchanged: {stats['unchanged']}"
+    )
+    return {
+        "message_count": stats["inserted"] + stats["updated"] + stats["unchanged"],
+        "ingest": stats,
+        "failed_windows": len(dixa.failed_windows),
+    }
 
 
 @shared_task
@@ -117,7 +117,10 @@ def download_elevio_task(prev):
         model="jina-embeddings-v4",
         task="text-matching",
         max_tokens=256,
-        output_path=None
+        output_path=None,
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+        max_batch_tokens=settings.EMBEDDING_MAX_BATCH_TOKENS,
+        concurrency=settings.EMBEDDING_CONCURRENCY,
     )
 
     tokenizer.embed_and_store_faqs(faq_items)
@@ -126,26 +129,16 @@ def download_elevio_task(prev):
     return {**prev, "faq_count": len(faq_items)}
 
 @shared_task
-def preprocess_messages_task(prev):
+def preprocess_messages_task(prev, force=False):
     print("🚀 Starting task: preprocess_messages_task")
     start = time.time()
 
-    preprocessor = MessagePreprocessor()
-    messages = Message.objects.all()
-    cleaned = 0
-
-    for msg in messages:
-        if not msg.text:
-            continue
-        cleaned_text = preprocessor.anonymize_text(msg.text)
-        if cleaned_text != msg.text:
-            msg.text = cleaned_text
-            msg.save(update_fields=["text"])
-            cleaned += 1
+    processed, cleaned = run_preprocessing(force=force)
 
     duration = round(time.time() - start, 2)
-    print(f"✅ Finished task: preprocess_messages_task in {duration}s | Cleaned: {cleaned}")
-    return {**prev, "preprocessed": cleaned}
+    nlp_report = nlp_registry.report()
+    print(f"✅ Finished task: preprocess_messages_task in {duration}s | Processed: {processed} | Cleaned: {cleaned} | RSS: {nlp_report['rss_mb']} MB")
+    return {**prev, "preprocessed": cleaned, "preprocess_processed": processed, "nlp_models": nlp_report}
 
 @shared_task
 def embed_messages_task(prev):
@@ -162,7 +155,10 @@ def embed_messages_task(prev):
         model="jina-embeddings-v4",
         task="text-matching",
         max_tokens=256,
-        output_path=None
+        output_path=None,
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+        max_batch_tokens=settings.EMBEDDING_MAX_BATCH_TOKENS,
+        concurrency=settings.EMBEDDING_CONCURRENCY,
     )
     count = Message.objects.filter(embedding__isnull=True).count()
     print(f"🔍 Messages to embed: {count}")
@@ -170,59 +166,216 @@ def embed_messages_task(prev):
 
     duration = round(time.time() - start, 2)
     print(f"✅ Finished task: embed_messages_task in {duration}s | Count: {len(embeddings)}")
-    return {**prev, "embedded_count": len(embeddings)}
-
-@shared_task
-def match_messages_task(prev, force=False):
-    print("🚀 Starting task: match_messages_task")
-    start = time.time()
-    
-    groq_key = os.getenv("GROQ_API_KEY")
-    gpt = GPTFAQAnalyzer(groq_api_key=groq_key)
-    sentiment_analyzer = SentimentAnalyzer(groq_api_key=groq_key)
-    saved = 0
-    
-    if force:
-        messages = Message.objects.filter(embedding__isnull=False)
-    else:
-        messages = Message.objects.filter(embedding__isnull=False, gpt_score__isnull=True)
-
-    for msg in messages:
+    return {**prev, "embedded_count": len(embeddings), "embedding_cache": tokenizer.cache.stats()}
+
+def _match_message_chunk(messages, faq_index, gpt, sentiment_analyzer, reranker, gate):
+    """Match one chunk of messages; FAQ candidates come from nearest_faqs_batch (HNSW or the FAQ index)."""
+    try:
+        candidates = nearest_faqs_batch([m.embedding for m in messages], k=5, index=faq_index)
+    except Exception as e:
+        print(f"⚠️ Batched FAQ lookup failed ({e}) — falling back to per-message lookup")
+        candidates = []
+        for m in messages:
+            try:
+                candidates.append(nearest_faqs(m.embedding, k=5, index=faq_index))
+            except Exception as inner:
+                print(f"⚠️ FAQ lookup failed for {m.message_id}: {inner}")
+                candidates.append([])
+
+    try:
+        sentiments = sentiment_analyzer.analyze_batch([m.text for m in messages])
+    except Exception as e:
+        print(f"⚠️ Batched sentiment failed for chunk: {e}")
+        sentiments = [None] * len(messages)
+
+    try:
+        faq_ids = reranker.rerank([m.text for m in messages], candidates)
+    except Exception as e:
+        print(f"⚠️ Batched rerank failed for chunk: {e} — using top FAQ candidates")
+        faq_ids = [top_faqs[0]["faq_id"] if top_faqs else None for top_faqs in candidates]
+
+    # Clear matches and clear misses are labelled from similarity alone; only the rest reach the LLM
+    verdicts = []
+    for faq_id, top_faqs in zip(faq_ids, candidates):
+        similarity = next((c["similarity"] for c in top_faqs if c["faq_id"] == faq_id), None)
+        verdicts.append(gate.assess(similarity) if faq_id in faq_index.faqs else None)
+
+    # LLM work runs concurrently through the scheduler; DB writes stay on this thread
+    def evaluate(item):
+        msg, faq_id, verdict = item
         try:
-            sentiment = sentiment_analyzer.analyze(msg.text)
-        except Exception as e:
-            print(f"⚠️ Sentiment failed for {msg.message_id}: {e}")
-            sentiment = None
-
-        try:
-            top_faqs = find_top_faqs(msg.embedding, top_n=5)
-            faq_id = rerank_with_gpt(msg.text, top_faqs, groq_api_key=groq_key)
-            matched_faq = FAQ.objects.filter(id=faq_id).first()
+            matched_faq = faq_index.faqs.get(faq_id)
 
             if matched_faq:
-                gpt_eval = gpt.score_resolution(msg.text, matched_faq.answer)
-            else:
-                raise Exception(f"FAQ not found for id={faq_id}")
+                return matched_faq, verdict or gpt.score_resolution(msg.text, matched_faq.answer)
+            raise Exception(f"FAQ not found for id={faq_id}")
 
         except Exception as e:
             print(f"⚠️ Groq match failed for {msg.message_id}: {e}")
-            matched_faq = None
-            gpt_eval = {"label": "unknown", "score": 0, "reason": "N/A"}
+            return None, {"label": "unknown", "score": 0, "reason": "N/A"}
+
+    evaluations = get_scheduler().map(evaluate, list(zip(messages, faq_ids, verdicts)))
 
+    matched_at = now()
+    for msg, sentiment, (matched_faq, gpt_eval) in zip(messages, sentiments, evaluations):
         msg.sentiment = sentiment
         msg.gpt_label = gpt_eval["label"]
         msg.gpt_score = gpt_eval["score"]
         msg.gpt_reason = gpt_eval["reason"]
         msg.matched_faq = matched_faq
-        msg.save(update_fields=[
-            "sentiment", "gpt_label", "gpt_score", "gpt_reason", "matched_faq"
-        ])
-        saved += 1
+        msg.matched_at = matched_at
+    # One write per chunk; matched_at is the checkpoint that makes re-running a chunk a no-op
+    with transaction.atomic():
+        Message.objects.bulk_update(messages, MATCH_FIELDS, batch_size=MATCH_WRITE_BATCH)
+    return len(messages)
+
+
+def pending_matches(run_started=None):
+    """
+    Messages still to match: without a resolution score, or for a forced
+    run, not matched since the run started.
+    """
+    messages = Message.objects.filter(embedding__isnull=False)
+    if run_started is not None:
+        return messages.filter(Q(matched_at__isnull=True) | Q(matched_at__lt=run_started))
+    return messages.filter(gpt_score__isnull=True)
+
+
+def merge_stats(total, stats):
+    """Add up (nested) numeric stats dicts of chunk results."""
+    for key, value in (stats or {}).items():
+        if isinstance(value, dict):
+            merge_stats(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+@shared_task(bind=True)
+def match_messages_task(self, prev, force=False, bypass_llm_cache=False):
+    """
+    Fan matching out as a chord of match_messages_chunk_task, one per
+    MATCH_CHUNK_SIZE pending message ids, and replace this task with it so
+    the pipeline chain continues after match_messages_done. A forced run
+    keeps its start time in a SyncCursor, so re-running it after a crash
+    resumes with the messages not matched since then.
+    """
+    print("🚀 Starting task: match_messages_task")
+    run_started = None
+    if force:
+        cursor, _ = SyncCursor.objects.get_or_create(name=MATCH_FORCE_CURSOR)
+        if cursor.position is None:
+            cursor.position = now()
+            cursor.save(update_fields=["position", "updated_at"])
+        else:
+            print(f"↩️ Resuming forced match run started at {cursor.position}")
+        run_started = cursor.position
+
+    # Drop the shared index version so every worker rebuilds its FAQ index once
+    invalidate_faq_index()
+
+    message_ids = list(pending_matches(run_started).order_by("message_id").values_list("message_id", flat=True))
+    chunk_size = settings.MATCH_CHUNK_SIZE
+    chunks = [message_ids[i:i + chunk_size] for i in range(0, len(message_ids), chunk_size)]
+    print(f"🔍 Messages to match: {len(message_ids)} in {len(chunks)} chunks")
+
+    since = run_started.isoformat() if run_started else None
+    if not chunks:
+        return match_messages_done([], prev=prev, force=force)
+
+    return self.replace(chord(
+        [match_messages_chunk_task.s(ids, since=since, bypass_llm_cache=bypass_llm_cache) for ids in chunks],
+        match_messages_done.s(prev=prev, force=force),
+    ))
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=3)
+def match_messages_chunk_task(self, message_ids, since=None, bypass_llm_cache=False):
+    """
+    Match one chunk of message ids and write the results in bulk. Messages
+    matched by an earlier attempt of this chunk are skipped, so a retried or
+    redelivered chunk only finishes what is left. Once its retries are used
+    up the chunk is returned as failed instead of raising, so the chord
+    callback and the rest of the pipeline still run.
+    """
+    start = time.time()
+    run_started = datetime.datetime.fromisoformat(since) if since else None
+    messages = list(
+        pending_matches(run_started)
+        .filter(message_id__in=message_ids)
+        .order_by("message_id")
+    )
+    if not messages:
+        return {"matched_messages": 0, "skipped": len(message_ids)}
+
+    groq_key = os.getenv("GROQ_API_KEY")
+    use_cache = False if bypass_llm_cache else None
+    gpt = GPTFAQAnalyzer(groq_api_key=groq_key, use_cache=use_cache)
+    sentiment_analyzer = SentimentAnalyzer(groq_api_key=groq_key, use_cache=use_cache)
+    reranker = FAQReranker(groq_api_key=groq_key, use_cache=use_cache)
+    gate = ResolutionGate()
+
+    try:
+        saved = _match_message_chunk(messages, get_faq_index(), gpt, sentiment_analyzer, reranker, gate)
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            print(f"❌ Match chunk of {len(message_ids)} messages failed after {self.request.retries} retries: {e}")
+            return {
+                "matched_messages": 0,
+                "skipped": len(message_ids),
+                "failed_chunks": [{"message_ids": message_ids, "error": str(e)}],
+            }
+        print(f"⚠️ Match chunk of {len(message_ids)} messages failed: {e} — retrying")
+        raise self.retry(exc=e, countdown=backoff_delay(self.request.retries, base=30.0, cap=600.0))
+
+    print(
+        f"✅ Matched chunk: {saved}/{len(message_ids)} in {round(time.time() - start, 2)}s | "
+        f"Sentiment routing: {sentiment_analyzer.stats} | Rerank: {reranker.stats} | Resolution gate: {gate.stats}"
+    )
+    get_scheduler().publish_metrics()
+    return {
+        "matched_messages": saved,
+        "skipped": len(message_ids) - saved,
+        "sentiment_routing": sentiment_analyzer.stats,
+        "rerank": reranker.stats,
+        "resolution_gate": gate.stats,
+        "llm_cache": {
+            "gpt": gpt.llm_cache.stats(),
+            "sentiment": sentiment_analyzer.llm_cache.stats(),
+            "rerank": reranker.llm_cache.stats(),
+        },
+    }
 
-    duration = round(time.time() - start, 2)
-    print(f"✅ Finished task: match_messages_task in {duration}s | Matched: {saved}")
-    return {**prev, "matched_messages": saved}
 
+@shared_task
+def match_messages_done(results, prev, force=False):
+    """
+    Chord callback: sum the chunk stats and close a forced run's cursor.
+    A forced run with failed chunks keeps its cursor, so running it again
+    resumes with the messages those chunks left unmatched.
+    """
+    totals = {"matched_messages": 0, "skipped": 0}
+    failed_chunks = []
+    for result in results:
+        merge_stats(totals, result)
+        failed_chunks.extend((result or {}).get("failed_chunks", []))
+    for cache_stats in totals.get("llm_cache", {}).values():
+        lookups = cache_stats.get("hits", 0) + cache_stats.get("misses", 0)
+        cache_stats["hit_rate"] = round(cache_stats.get("hits", 0) / lookups, 3) if lookups else 0.0
+    # Chunks each use a fresh cache instance, so expiry and the size bound are enforced once per run
+    try:
+        LLMResponseCache().evict()
+    except Exception as e:
+        print(f"⚠️ LLM cache eviction failed: {e}")
+
+    if failed_chunks:
+        failed = sum(len(chunk["message_ids"]) for chunk in failed_chunks)
+        print(f"⚠️ {len(failed_chunks)} match chunks ({failed} messages) failed — they stay pending for the next run")
+    elif force:
+        SyncCursor.objects.filter(name=MATCH_FORCE_CURSOR).update(position=None, updated_at=now())
+
+    print(f"✅ Finished task: match_messages_task | Chunks: {len(results)} | {totals}")
+    return {**prev, **totals, "match_chunks": len(results), "failed_chunks": failed_chunks}
 
 
 @shared_task
@@ -291,7 +444,10 @@ def cache_trending_questions_leaderboard():
     today = now().date()
     start_date = today - timedelta(days=14)
 
-    messages = Message.objects.filter(created_at__date__gte=start_date, embedding__isnull=False)
+    # Stable ordering keeps each day's keyword prompt identical across runs, so it hits the LLM cache
+    messages = Message.objects.filter(
+        created_at__date__gte=start_date, embedding__isnull=False
+    ).order_by("created_at", "message_id")
 
     messages_by_date = collections.defaultdict(list)
     for msg in messages:
@@ -423,12 +579,7 @@ Questions:
 {json.dumps(questions)}
 """
 
-    response = gpt.client.chat.completions.create(
-        model=gpt.model,
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    content = response.choices[0].message.content.strip()
+    content = gpt._complete("top_process_gaps", [{"role": "user", "content": prompt}])
     result = json.loads(content)
     cache.set("cached_top_process_gaps", result, timeout=3600)
     return {"cached_topics": len(result)}
@@ -0,0 +1,53 @@
+# backend/faq_api/tests/test_local_sentiment.py
+from django.test import SimpleTestCase
+from faq_api.utils.local_sentiment import LexiconSentimentModel
+
+
+class NegationScopeTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = LexiconSentimentModel()
+
+    def test_negation_flips_the_following_words(self):
+        self.assertEqual(self.model.predict("the answer was not helpful")[0], "negative")
+        self.assertEqual(self.model.predict("het was niet goed")[0], "negative")
+
+    def test_negation_stops_at_sentence_end(self):
+        self.assertEqual(self.model.predict("It did not arrive. Terrible, awful service")[0], "negative")
+
+    def test_negation_stops_at_clause_punctuation(self):
+        self.assertEqual(self.model.predict("No. Great, thanks, excellent help!")[0], "positive")
+        self.assertEqual(self.model.score("not, great"), (3.0, 0.0))
+
+    def test_negation_window_is_limited(self):
+        positive, negative = self.model.score("not that it matters much but great")
+        self.assertEqual((positive, negative), (3.0, 0.0))
+
+    def test_no_worries_is_not_a_negation(self):
+        self.assertEqual(self.model.predict("no worries, great!")[0], "positive")
+        self.assertEqual(self.model.score("no problem great"), (3.0, 0.0))
+        self.assertEqual(self.model.score("geen probleem"), (0.0, 0.0))
+
+
+class IntensifierTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = LexiconSentimentModel()
+
+    def test_intensifier_boosts_the_next_word(self):
+        self.assertEqual(self.model.score("very good"), (3.0, 0.0))
+        self.assertEqual(self.model.score("very bad"), (0.0, 3.0))
+
+    def test_intensifier_only_applies_once(self):
+        self.assertEqual(self.model.score("very good good"), (5.0, 0.0))
+
+    def test_intensifier_stops_at_punctuation(self):
+        self.assertEqual(self.model.score("very. good"), (2.0, 0.0))
+
+    def test_negated_intensified_word(self):
+        self.assertEqual(self.model.score("not very good"), (0.0, 3.0))
+
+    def test_no_evidence_is_neutral(self):
+        self.assertEqual(self.model.predict("where is my parcel"), ("neutral", 0.0))
@@ -0,0 +1,88 @@
+# backend/faq_api/utils/boilerplate.py
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+DEFAULT_PHRASES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "boilerplate_phrases.txt"
+)
+
+
+def normalize_phrase(phrase):
+    """
+    Normalize a phrase the way clean_html normalizes message text: non-ASCII
+    characters are dropped and whitespace is collapsed, lower-cased for the trie.
+    """
+    phrase = phrase.encode("ascii", "ignore").decode()
+    return " ".join(phrase.split()).lower()
+
+
+def load_phrases(path=None):
+    """Read one phrase per line, skipping blank lines and # comments."""
+    with open(path or DEFAULT_PHRASES_PATH, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def _trie_pattern(phrases):
+    """
+    Build a regex from a character trie of the phrases, so shared prefixes
+    are matched once and the engine branches on the next character instead
+    of trying every phrase in turn. Spaces match any whitespace run.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def token(ch):
+        return r"\s+" if ch == " " else re.escape(ch)
+
+    def build(node):
+        ends_here = "" in node
+        branches = [token(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not ends_here:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if ends_here else group
+
+    return build(trie)
+
+
+class BoilerplateStripper:
+    """
+    Removes every boilerplate phrase in a single pass over the text.
+    Phrases are matched case-insensitively and only on word boundaries,
+    preferring the longest phrase at each position.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = sorted({normalize_phrase(p) for p in phrases if normalize_phrase(p)})
+        self.fingerprint = hashlib.sha256("\n".join(self.phrases).encode("utf-8")).hexdigest()[:16]
+        if self.phrases:
+            self.pattern = re.compile(r"(?<!\w)" + _trie_pattern(self.phrases) + r"(?!\w)", re.IGNORECASE)
+        else:
+            self.pattern = None
+
+    @classmethod
+    def from_file(cls, path=None):
+        return cls(load_phrases(path))
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def strip(self, text):
+        if self.pattern is None:
+            return text
+        return self.pattern.sub("", text)
+
+
+@lru_cache(maxsize=None)
+def get_stripper(path=None):
+    """Compiled stripper for a phrase file, built once per process."""
+    return BoilerplateStripper.from_file(path)
@@ -0,0 +1,75 @@
+# backend/faq_api/utils/bulk_copy.py
+import io
+from itertools import islice
+from django.db import connection
+
+COPY_BUFFER_SIZE = 1 << 16
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_value(value):
+    """One field in COPY text format."""
+    if value is None:
+        return "\\N"
+    return str(value).translate(COPY_ESCAPES)
+
+
+class RowStream(io.RawIOBase):
+    """
+    Read-only file over an iterator of row tuples, rendered lazily as COPY
+    text lines so a large insert never holds every row in memory.
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = b""
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while len(self.buffer) < len(target):
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.count += 1
+            self.buffer += ("\t".join(copy_value(v) for v in row) + "\n").encode("utf-8")
+        n = min(len(target), len(self.buffer))
+        target[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        return n
+
+
+def copy_rows(model, fields, rows, batch_size=5000):
+    """
+    Insert rows (tuples of raw column values, in `fields` order) into
+    model's table. On PostgreSQL this is one streamed COPY (psycopg2 or
+    psycopg 3); other backends get bulk_create in batch_size chunks. Call
+    inside transaction.atomic() to make it all-or-nothing. Returns the
+    number of rows written.
+    """
+    columns = [model._meta.get_field(name).column for name in fields]
+
+    if connection.vendor == "postgresql":
+        quote = connection.ops.quote_name
+        sql = f"COPY {quote(model._meta.db_table)} ({', '.join(quote(c) for c in columns)}) FROM STDIN"
+        stream = RowStream(rows)
+        reader = io.BufferedReader(stream, buffer_size=COPY_BUFFER_SIZE)
+        with connection.cursor() as cursor:
+            if hasattr(cursor.cursor, "copy_expert"):
+                cursor.cursor.copy_expert(sql, reader)
+            else:
+                with cursor.cursor.copy(sql) as copy:
+                    for block in iter(lambda: reader.read(COPY_BUFFER_SIZE), b""):
+                        copy.write(block)
+        return stream.count
+
+    attnames = [model._meta.get_field(name).attname for name in fields]
+    rows, written = iter(rows), 0
+    while True:
+        batch = [model(**dict(zip(attnames, row))) for row in islice(rows, batch_size)]
+        if not batch:
+            return written
+        model.objects.bulk_create(batch)
+        written += len(batch)
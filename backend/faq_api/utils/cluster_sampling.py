@@ -0,0 +1,80 @@
+# backend/faq_api/utils/cluster_sampling.py
+from functools import lru_cache
+import numpy as np
+import tiktoken
+from django.conf import settings
+from faq_api.utils.embedding_cache import normalize_text
+
+# stop looking for a message that still fits once this many in a row did not
+MAX_CONSECUTIVE_MISFITS = 50
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """The cl100k_base encoder Tokenizer uses, shared by every prompt budget."""
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def truncate_tokens(text, max_tokens, encoding):
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    return encoding.decode(tokens[:max_tokens]), max_tokens
+
+
+def select_representatives(items, centroid=None, token_budget=None, mmr_lambda=None, max_item_tokens=None):
+    """
+    Representative messages of one cluster for LLM prompts, chosen by
+    maximal marginal relevance over their embeddings: each pick maximizes
+    lambda * similarity to the centroid - (1 - lambda) * similarity to the
+    messages already picked, so the sample starts at the centre and then
+    adds diverse outliers. Picks stop once token_budget (cl100k tokens) is
+    full; long messages are truncated to max_item_tokens and duplicate
+    texts are skipped. Returns item dicts, most representative first, whose
+    "text" is the (possibly truncated) prompt text and "full_text" the
+    original message text.
+    """
+    token_budget = token_budget or settings.CLUSTER_PROMPT_TOKEN_BUDGET
+    mmr_lambda = settings.CLUSTER_SAMPLE_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    max_item_tokens = max_item_tokens or settings.CLUSTER_SAMPLE_MAX_ITEM_TOKENS
+    encoding = get_encoding()
+
+    seen = set()
+    candidates = []
+    for item in items:
+        key = normalize_text(item.get("text") or "").lower()
+        if key and key not in seen and item.get("embedding") is not None:
+            seen.add(key)
+            candidates.append(item)
+    if not candidates:
+        return []
+
+    vecs = np.asarray([item["embedding"] for item in candidates], dtype=np.float32)
+    vecs /= np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+    centre = np.asarray(centroid if centroid is not None else vecs.mean(axis=0), dtype=np.float32)
+    centre /= max(float(np.linalg.norm(centre)), 1e-12)
+
+    relevance = vecs @ centre
+    redundancy = np.full(len(candidates), -1.0, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+
+    selected, used, misfits = [], 0, 0
+    while available.any() and misfits < MAX_CONSECUTIVE_MISFITS:
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * np.maximum(redundancy, 0)
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        available[best] = False
+
+        text, n_tokens = truncate_tokens(candidates[best]["text"], max_item_tokens, encoding)
+        if used + n_tokens > token_budget:
+            misfits += 1
+            continue  # too long for what is left; a shorter one may still fit
+        misfits = 0
+        used += n_tokens
+        selected.append({**candidates[best], "text": text, "full_text": candidates[best]["text"]})
+        redundancy = np.maximum(redundancy, vecs @ vecs[best])
+
+        if token_budget - used < 8:
+            break
+
+    return selected
@@ -1,7 +1,6 @@
 #backend/faq_api/utils/clustering.py
 import numpy as np
 import hdbscan
-from sklearn.metrics.pairwise import cosine_similarity
 from collections import Counter
 import re
 import string
@@ -60,25 +59,26 @@ class MessageClusterer:
             centroids[label] = centroid
         return centroids
 
-    def match_faqs(self, centroids, faqs):
+    def match_faqs(self, centroids, faq_index):
         """
-        faqs: list of dicts with 'question', 'embedding'
+        faq_index: FAQIndex (see faq_api.utils.faq_index)
         """
-        if not faqs or not centroids:
+        if not len(faq_index) or not centroids:
             raise ValueError("Cannot match FAQs — missing input.")
 
-        faq_vectors = np.array([f['embedding'] for f in faqs])
         cluster_ids = list(centroids.keys())
         centroid_vecs = np.array([centroids[cid] for cid in cluster_ids])
 
-        similarities = cosine_similarity(centroid_vecs, faq_vectors)
+        hits = faq_index.search(centroid_vecs, top_n=1)
         results = {}
 
-        for i, cid in enumerate(cluster_ids):
-            top_faq_index = np.argmax(similarities[i])
+        for cid, top in zip(cluster_ids, hits):
+            faq_id, similarity = top[0]
+            faq = faq_index.faqs.get(faq_id)
             results[cid] = {
-                "matched_faq": faqs[top_faq_index]['question'],
-                "similarity": similarities[i][top_faq_index]
+                "faq_id": faq_id,
+                "matched_faq": faq.question if faq else "",
+                "similarity": similarity
             }
 
         return results
@@ -1,41 +1,66 @@
 #backend/faq_api/utils/clustering_pipeline.py
 import logging
-from django.conf import settings
-from faq_api.models import Message, FAQ, ClusterResult, ClusterRun
+import os
+from django.db import models, transaction
+from faq_api.models import Message, ClusterResult, ClusterResultMessage, ClusterRun
+from faq_api.utils.bulk_copy import copy_rows
 from faq_api.utils.clustering import MessageClusterer
+from faq_api.utils.cluster_sampling import select_representatives
+from faq_api.utils.faq_index import get_faq_index
 from faq_api.utils.gpt import GPTFAQAnalyzer
-from faq_api.utils.sentiment import SentimentAnalyzer
-from faq_api.models import ClusterResultMessage
+from faq_api.utils.llm_scheduler import get_scheduler
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+CLUSTER_WRITE_BATCH = 1000
+
+
+def fit_to_model(model, values):
+    """
+    values coerced to model's columns, so one odd LLM answer cannot fail
+    the whole insert: text becomes str without NUL bytes, cut to
+    max_length; numbers that do not parse become 0.
+    """
+    fitted = {}
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        if isinstance(field, (models.CharField, models.TextField)):
+            value = "" if value is None else str(value).replace("\x00", "")
+            if field.max_length:
+                value = value[:field.max_length]
+        elif isinstance(field, (models.IntegerField, models.FloatField)):
+            try:
+                value = float(value)
+                value = int(round(value)) if isinstance(field, models.IntegerField) else value
+            except (TypeError, ValueError, OverflowError):
+                value = 0
+        fitted[name] = value
+    return fitted
+
+
 def run_clustering_and_save():
     logger.info("Starting clustering pipeline...")
 
-    ClusterRun.objects.all().delete()
-    run = ClusterRun.objects.create(notes="Automated weekly pipeline")
-    logger.info(f"📌 Created new ClusterRun: {run.id}")
+    # Saved together with its results, replacing the previous run only once they are written
+    run = ClusterRun(notes="Automated weekly pipeline")
 
     messages = list(
         Message.objects.exclude(embedding=None).values("message_id", "text", "embedding", "created_at")
     )
-    faqs = list(FAQ.objects.exclude(embedding=None).values("id", "question", "embedding"))
+    faq_index = get_faq_index(refresh=True)
 
     logger.info(f"🗂️ Loaded {len(messages)} messages with embeddings")
-    logger.info(f"📚 Loaded {len(faqs)} FAQs with embeddings")
+    logger.info(f"📚 Loaded {len(faq_index)} FAQs with embeddings")
 
     if not messages:
         logger.warning("❌ No messages to process. Exiting pipeline.")
         return
 
-    if not faqs:
+    if not len(faq_index):
         logger.warning("❌ No FAQs available for matching. Exiting pipeline.")
         return
 
-    # Pre-cache FAQs by question text
-    faq_map = {faq["question"]: FAQ.objects.get(id=faq["id"]) for faq in faqs}
-
     clusterer = MessageClusterer(min_cluster_size=5)
     clustered, labels, vecs = clusterer.cluster_embeddings(messages)
 
@@ -51,7 +76,7 @@ def run_clustering_and_save():
     logger.info(f"📍 Computed {len(centroids)} cluster centroids")
 
     try:
-        matches = clusterer.match_faqs(centroids, faqs)
+        matches = clusterer.match_faqs(centroids, faq_index)
     except ValueError as e:
         logger.exception(f"❌ FAQ matching failed: {e}")
         return
@@ -59,75 +84,85 @@ def run_clustering_and_save():
     try:
         cluster_map = clusterer.get_cluster_map_coords(messages, labels, vecs)
         run.cluster_map = cluster_map
-        run.save()
-        logger.info("🗺️ Cluster map saved to run object.")
+        logger.info("🗺️ Cluster map added to run object.")
     except Exception as e:
         logger.warning(f"⚠️ Failed to generate cluster map: {e}")
 
-    gpt = GPTFAQAnalyzer(openai_api_key=settings.OPENAI_API_KEY)
-    sentiment_analyzer = SentimentAnalyzer()
+    gpt = GPTFAQAnalyzer(groq_api_key=os.getenv("GROQ_API_KEY"))
+    # Sorted so results (and their primary keys) come out in the same order every run
+    cluster_ids = sorted(clustered)
 
-    for cluster_id, items in clustered.items():
+    def analyze(cluster_id):
+        """
+        LLM analysis and keywords for one cluster, as an unsaved ClusterResult.
+        Runs on the scheduler's threads; all DB writes happen afterwards.
+        """
+        items = clustered[cluster_id]
         try:
-            top_message = items[0]["text"]
-            created_at = items[0].get("created_at") or datetime.utcnow()
-
             matched = matches.get(cluster_id, {})
             matched_faq_question = matched.get("matched_faq", "")
-            similarity = matched.get("similarity", 0.0)
 
-            matched_faq = faq_map.get(matched_faq_question)
+            matched_faq = faq_index.faqs.get(matched.get("faq_id"))
             if not matched_faq:
                 logger.warning(f"⚠️ FAQ match failed for cluster {cluster_id} — question not found: {matched_faq_question}")
-                continue 
+                return None
 
+            # Every cluster prompt (and any per-field fallback) sees the same budgeted sample
+            sample = select_representatives(items, centroids[cluster_id]) or items[:1]
+            analysis = gpt.analyze_cluster(sample, matched_faq_question, matched_faq.answer)
+            if analysis["fallbacks"]:
+                logger.info(f"↩️ Cluster {cluster_id}: individual calls for {analysis['fallbacks']}")
 
-            score_data = gpt.score_resolution(top_message, matched_faq_question)
-            gpt_eval = f"{score_data.get('label')} — {score_data.get('reason')}"
-            coverage_label = score_data.get("label", "Unknown")
-            resolution_score = score_data.get("score", 0)
-            resolution_reason = score_data.get("reason", "")
-
-            faq_suggestion = None
-            if coverage_label in ["Not", "Partially"]:
-                faq_suggestion = gpt.suggest_faq(top_message)
-
-            sentiment = sentiment_analyzer.analyze(top_message)
-            summary = gpt.summarize_cluster(items)
-            keywords = clusterer.extract_keywords([msg["text"] for msg in items])
-            topic_label = gpt.label_topic(items)
-
-            result = ClusterResult.objects.create(
-                run=run,
+            return ClusterResult(**fit_to_model(ClusterResult, dict(
                 cluster_id=cluster_id,
                 message_count=len(items),
-                top_message=top_message,
+                # the prompt copy may be truncated; store the message as written
+                top_message=sample[0].get("full_text", sample[0]["text"]),
                 matched_faq=matched_faq,
-                similarity=similarity,
-                gpt_evaluation=gpt_eval,
-                sentiment=sentiment,
-                keywords=keywords,
-                summary=summary,
-                created_at=created_at,
-                coverage=coverage_label,
-                resolution_score=resolution_score,
-                resolution_reason=resolution_reason,
-                faq_suggestion=faq_suggestion,
-                topic_label=topic_label
-            )
-
-            # Attach messages
-            message_ids = [msg["message_id"] for msg in items]
-            linked_messages = Message.objects.filter(message_id__in=message_ids)
-            
-            for msg in linked_messages:
-                ClusterResultMessage.objects.create(
-                    cluster_result=result,
-                    message=msg
-                )
-            logger.info(f"✅ Saved cluster result for cluster_id={cluster_id} ({len(items)} messages)")
+                similarity=matched.get("similarity", 0.0),
+                gpt_evaluation=f"{analysis['label']} — {analysis['reason']}",
+                sentiment=analysis["sentiment"],
+                keywords=clusterer.extract_keywords([msg["text"] for msg in items]),
+                summary=analysis["summary"],
+                created_at=items[0].get("created_at") or datetime.utcnow(),
+                coverage=analysis["label"],
+                resolution_score=analysis["score"],
+                resolution_reason=analysis["reason"],
+                faq_suggestion=analysis["faq_suggestion"],
+                topic_label=analysis["topic_label"]
+            )))
         except Exception as e:
-            logger.exception(f"❌ Failed processing cluster {cluster_id}: {e}")
+            logger.exception(f"❌ Failed analyzing cluster {cluster_id}: {e}")
+            return None
+
+    results = [result for result in get_scheduler().map(analyze, cluster_ids) if result is not None]
+
+    try:
+        with transaction.atomic():
+            ClusterRun.objects.all().delete()
+            run.save()
+            logger.info(f"📌 Created new ClusterRun: {run.id}")
+            for result in results:
+                result.run = run
+            # Postgres returns the new primary keys, so the link rows can point at them directly
+            ClusterResult.objects.bulk_create(results, batch_size=CLUSTER_WRITE_BATCH)
+            # Links straight from the in-memory message ids, streamed; no Message rows are loaded
+            links = copy_rows(
+                ClusterResultMessage,
+                ["cluster_result", "message"],
+                ((result.pk, msg["message_id"]) for result in results for msg in clustered[result.cluster_id]),
+                batch_size=CLUSTER_WRITE_BATCH,
+            )
+        logger.info(f"✅ Saved {len(results)} cluster results with {links} message links")
+    except Exception as e:
+        logger.exception(f"❌ Failed saving cluster results — previous run kept: {e}")
+        raise
 
+    logger.info(f"📈 LLM scheduler: {get_scheduler().publish_metrics()}")
+    try:
+        gpt.llm_cache.evict()
+    except Exception as e:
+        logger.warning(f"⚠️ LLM cache eviction failed: {e}")
+    logger.info(f"🗄️ LLM cache: {gpt.llm_cache.stats()}")
     logger.info("Clustering pipeline processing completed successfully.")
     return len(clustered)
@@ -4,10 +4,17 @@ import os
 import json
 import time
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from faq_api.utils.rate_limit import AdaptiveThrottle, TokenBucket, backoff_delay, retry_after_seconds
 
 
 class DixaDownloader:
-    def __init__(self, api_token, start_date, end_date, step=datetime.timedelta(days=31),conversations_url="https://exports.dixa.io/v1/conversation_export", messages_url= "https://exports.dixa.io/v1/message_export"):
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_token, start_date, end_date, step=datetime.timedelta(days=31),conversations_url="https://exports.dixa.io/v1/conversation_export", messages_url= "https://exports.dixa.io/v1/message_export",
+                 requests_per_minute=10, burst=2, max_workers=4, max_retries=5, timeout=300):
         self.conversations_url = conversations_url
         self.messages_url = messages_url
         self.api_token = api_token
@@ -20,6 +27,24 @@ class DixaDownloader:
         }
         self.output_dir = "dixa_data"
 
+        # Shared request budget for all windows and both export endpoints
+        self.rate_limiter = TokenBucket(requests_per_minute, capacity=burst)
+        self.throttle = AdaptiveThrottle(base=2.0, cap=120.0)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        # both export endpoints may run max_workers requests each
+        adapter = HTTPAdapter(pool_maxsize=2 * self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+
+        # (url, start, end, reason) of windows that returned no data because the fetch failed
+        self.failed_windows = []
+        self._failed_lock = threading.Lock()
+
     def setup_output_directory(self):
         """Create output directory if it doesn't exist"""
         if not os.path.exists(self.output_dir):
@@ -40,9 +65,10 @@ class DixaDownloader:
             raise
 
     def daterange(self):
-        while self.start < self.end:
-            yield (self.start, min(self.start + self.step, self.end))
-            self.start += self.step
+        current = self.start
+        while current < self.end:
+            yield (current, min(current + self.step, self.end))
+            current += self.step
 
     def fetch_data(self, url, start, end):
         params = {
@@ -50,8 +76,32 @@ class DixaDownloader:
             "created_before": end.strftime("%Y-%m-%d")
         }
         print(f"Fetching data from {start} to {end}")
-        response = requests.get(url, headers=self.headers, params=params)
+        for attempt in range(self.max_retries + 1):
+            self.throttle.wait()
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                if attempt == self.max_retries:
+                    print(f"Failed: {e}")
+                    return self.record_failure(url, start, end, str(e))
+                delay = backoff_delay(attempt, base=2.0, cap=120.0)
+                print(f"Request error ({e}) — retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                break
+            if response.status_code == 429:
+                delay = self.throttle.on_rate_limited(retry_after_seconds(response))
+                print(f"Rate-limited — pausing all workers for {delay:.1f}s")
+            else:
+                delay = backoff_delay(attempt, base=2.0, cap=120.0)
+                print(f"Server error {response.status_code} — retrying in {delay:.1f}s")
+                time.sleep(delay)
+
         if response.status_code == 200:
+            self.throttle.on_success()
             try:
                 result = response.json()
                 if isinstance(result, dict):
@@ -60,20 +110,67 @@ class DixaDownloader:
                     return result
                 else:
                     print("Unexpected response format")
-                    return []
+                    return self.record_failure(url, start, end, "unexpected response format")
             except json.JSONDecodeError:
                 print("Failed to decode JSON")
-                return []
+                return self.record_failure(url, start, end, "invalid JSON")
         else:
             print(f"Failed: {response.status_code} - {response.text}")
-            return []
+            return self.record_failure(url, start, end, f"HTTP {response.status_code}")
+
+    def record_failure(self, url, start, end, reason):
+        """Remember a window whose data was skipped, so the sync cursor does not move past it."""
+        with self._failed_lock:
+            self.failed_windows.append((url, start, end, reason))
+        return []
+
+    def first_failed_start(self, url=None):
+        """Start of the earliest failed window (of one endpoint), or None if every window succeeded."""
+        starts = [start for u, start, _, _ in self.failed_windows if url is None or u == url]
+        return min(starts) if starts else None
 
 
-    def save_json(self, filename, data):
+    def save_json(self, filename, data, indent=2):
         with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+            json.dump(data, f, indent=indent)
         print(f"Saved {filename}")
 
+    def iter_windows(self, url):
+        """
+        Fetch date windows of one endpoint concurrently (within the shared
+        rate limit) and yield (start, end, data) in window order. At most
+        max_workers windows are in flight or buffered at any time.
+        """
+        windows = list(self.daterange())
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = []
+            for start, end in windows:
+                pending.append((start, end, executor.submit(self.fetch_data, url, start, end)))
+                if len(pending) >= self.max_workers:
+                    start_, end_, future = pending.pop(0)
+                    yield start_, end_, future.result()
+            for start_, end_, future in pending:
+                yield start_, end_, future.result()
+
+    def iter_messages(self, save_json=False):
+        """
+        Stream messages range by range instead of accumulating the whole
+        export: only a few date windows are held in memory at a time, so peak
+        memory is bounded by `step` × max_workers, not by the width of the
+        date range.
+        """
+        print("Starting streaming Dixa message download...")
+        if save_json:
+            self.setup_output_directory()
+
+        for start, end, msg_data in self.iter_windows(self.messages_url):
+            print(f"Processing range {start} to {end}...")
+            if save_json:
+                self.save_json(os.path.join(self.output_dir, f"messages_{start}_{end}.json"), msg_data, indent=None)
+
+            yield from msg_data
+            del msg_data
+
     # Main loop
     def download_all_dixa_data(self):
         "Main function to download all the dixa data"
@@ -84,19 +181,17 @@ class DixaDownloader:
         all_messages = []
         all_conversations = []
 
-        for start, end in self.daterange():
-            print(f"Processing range {start} to {end}...")
+        # Both endpoints are fetched concurrently, sharing one rate limit
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            conversations = executor.submit(list, self.iter_windows(self.conversations_url))
+            messages = executor.submit(list, self.iter_windows(self.messages_url))
+
+            for start, end, conv_data in conversations.result():
+                all_conversations.extend(conv_data)
+                self.save_json(os.path.join(self.output_dir, f"conversations_{start}_{end}.json"), conv_data)
+
+            for start, end, msg_data in messages.result():
+                all_messages.extend(msg_data)
+                self.save_json(os.path.join(self.output_dir, f"messages_{start}_{end}.json"), msg_data)
 
-            # Fetch and save all conversations
-            conv_data = self.fetch_data(self.conversations_url, start, end)
-            all_conversations.extend(conv_data)
-            self.save_json(os.path.join(self.output_dir, f"conversations_{start}_{end}.json"), conv_data)
-            time.sleep(6)
-
-            # Fetch and save all messages
-            msg_data = self.fetch_data(self.messages_url, start, end)
-            all_messages.extend(msg_data)
-            self.save_json(os.path.join(self.output_dir, f"messages_{start}_{end}.json"), msg_data)
-            time.sleep(20)
-        
         return all_messages,all_conversations
@@ -219,6 +219,9 @@ class ElevioFAQDownloader:
                 task="text-matching",
                 max_tokens=256,
                 output_path=None,
+                batch_size=settings.EMBEDDING_BATCH_SIZE,
+                max_batch_tokens=settings.EMBEDDING_MAX_BATCH_TOKENS,
+                concurrency=settings.EMBEDDING_CONCURRENCY,
             )
             embedded_count, failures = tokenizer.embed_and_store_faqs(faq_items)
             print(f"✅ Re-embedded {embedded_count} FAQs; {len(failures)} failures.")
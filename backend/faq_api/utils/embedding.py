@@ -1,11 +1,13 @@
 # backend/faq_api/utils/embedding.py
 import os
 import json
-import requests
+import threading
 import tiktoken
 from datetime import datetime
 from bs4 import BeautifulSoup
 from faq_api.models import FAQ, Message
+from faq_api.utils.embedding_cache import EmbeddingCache, cache_key
+from faq_api.utils.embedding_client import EmbeddingRequestError, JinaEmbeddingClient
 
 class Tokenizer:
     def __init__(
@@ -17,6 +19,12 @@ class Tokenizer:
         max_tokens=256,
         tokenizer=None,
         output_path=None,
+        batch_size=64,
+        max_batch_tokens=16384,
+        concurrency=4,
+        jina_url="https://api.jina.ai/v1/embeddings",
+        cache=None,
+        use_cache=True,
     ):
         self.messages_path = messages_path
         self.jina_api_key = jina_api_key
@@ -26,36 +34,140 @@ class Tokenizer:
         # default to GPT-style tokenizer if none provided
         self.tokenizer = tokenizer or tiktoken.get_encoding("cl100k_base")
         self.output_path = output_path
-
-        self.jina_url = "https://api.jina.ai/v1/embeddings"
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.jina_api_key}"
-        }
+        # Batching limits: max inputs and max (truncated) tokens per request
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+        self.jina_url = jina_url
+        # Shared keep-alive session + bounded worker pool for all requests
+        self.client = JinaEmbeddingClient(
+            url=self.jina_url,
+            api_key=self.jina_api_key,
+            model=self.model,
+            task=self.task,
+            concurrency=concurrency,
+        )
 
         # Track the first embedding length we see, to enforce uniform dims
         self.expected_dim = None
+        self._dim_lock = threading.Lock()
+
+        # Content-addressed cache checked before any API call
+        self.cache = cache or EmbeddingCache(enabled=None if use_cache else False)
 
     def test_embedding(self):
         """Quick smoke test against Jina endpoint."""
-        payload = {
-            "model": self.model,
-            "task": self.task,
-            "input": [{"text": "Hello, world!"}]
-        }
         try:
-            resp = requests.post(self.jina_url, headers=self.headers, json=payload)
-            resp.raise_for_status()
-            data = resp.json().get("data", [])
-            print("Embedding retrieved:", data[0]["embedding"][:5])
+            embedding = self.client.embed(["Hello, world!"])[0]
+            print("Embedding retrieved:", embedding[:5])
         except Exception as e:
             print("❌", e)
 
-    def truncate_text(self, text):
+    def prepare_text(self, text):
+        """Truncate text to max_tokens and return it with its token count."""
         tokens = self.tokenizer.encode(text)
         if len(tokens) > self.max_tokens:
-            return self.tokenizer.decode(tokens[: self.max_tokens])
-        return text
+            return self.tokenizer.decode(tokens[: self.max_tokens]), self.max_tokens
+        return text, len(tokens)
+
+    def iter_batches(self, items):
+        """
+        Group (key, text, n_tokens) items into request batches bounded by
+        batch_size inputs and max_batch_tokens tokens.
+        """
+        batch, batch_tokens = [], 0
+        for key, text, n_tokens in items:
+            if batch and (
+                len(batch) >= self.batch_size
+                or batch_tokens + n_tokens > self.max_batch_tokens
+            ):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append((key, text))
+            batch_tokens += n_tokens
+        if batch:
+            yield batch
+
+    def request_embeddings(self, texts):
+        """Send one multi-input request to Jina and return embeddings in input order."""
+        return self.client.embed(texts)
+
+    def check_dim(self, embedding):
+        """Enforce a consistent embedding dimension across the run."""
+        with self._dim_lock:
+            if self.expected_dim is None:
+                self.expected_dim = len(embedding)
+                print(f"ℹ️ Expecting embedding dim = {self.expected_dim}")
+                return True
+            return len(embedding) == self.expected_dim
+
+    def cache_key(self, text):
+        return cache_key(self.model, self.task, self.max_tokens, text)
+
+    def embed_batches(self, items):
+        """
+        Embed (key, text, n_tokens) items, yielding (batch, embeddings by key,
+        failures). Cached texts are yielded first, batch_size at a time and
+        without an API call; the remaining unique texts are embedded
+        concurrently and cached.
+        """
+        items = list(items)
+        keyed = [(key, text, n_tokens, self.cache_key(text)) for key, text, n_tokens in items]
+        cached = self.cache.get_many([ck for _, _, _, ck in keyed])
+
+        hits = {}
+        owners = {}
+        misses = []
+        for key, text, n_tokens, ck in keyed:
+            if ck in cached and self.check_dim(cached[ck]):
+                hits[key] = cached[ck]
+                continue
+            if ck not in owners:
+                owners[ck] = []
+                misses.append((ck, text, n_tokens))
+            owners[ck].append(key)
+
+        hit_keys = list(hits)
+        for i in range(0, len(hit_keys), self.batch_size):
+            yield None, {key: hits[key] for key in hit_keys[i:i + self.batch_size]}, []
+
+        for batch, (results, failed) in self.client.map_concurrent(
+            self.embed_batch, self.iter_batches(misses)
+        ):
+            self.cache.set_many(self.model, results)
+            yield (
+                batch,
+                {key: embedding for ck, embedding in results.items() for key in owners[ck]},
+                [(key, error) for ck, error in failed for key in owners[ck]],
+            )
+
+    def embed_batch(self, batch):
+        """
+        Embed a batch of (key, text) pairs in a single request.
+        If the API rejects the payload (400/413/422), the batch is split in
+        half and each half is retried, so one bad input only fails itself.
+        Any other failure (network, 429/5xx after retries, auth) fails the
+        whole batch without sending more requests.
+        Returns (embeddings by key, list of (key, error)).
+        """
+        try:
+            vectors = self.request_embeddings([text for _, text in batch])
+        except Exception as e:
+            if len(batch) == 1 or not (isinstance(e, EmbeddingRequestError) and e.splittable):
+                return {}, [(key, str(e)) for key, _ in batch]
+            print(f"⚠️ Batch of {len(batch)} failed ({e}) — splitting and retrying")
+            mid = len(batch) // 2
+            left, left_failed = self.embed_batch(batch[:mid])
+            right, right_failed = self.embed_batch(batch[mid:])
+            return {**left, **right}, left_failed + right_failed
+
+        results, failed = {}, []
+        for (key, _), embedding in zip(batch, vectors):
+            if not self.check_dim(embedding):
+                failed.append((key, f"dim {len(embedding)} ≠ {self.expected_dim}"))
+                continue
+            results[key] = embedding
+        return results, failed
 
     def strip_html(self, raw_html):
         return BeautifulSoup(raw_html, "html.parser").get_text(separator=" ").strip()
@@ -122,12 +234,14 @@ class Tokenizer:
         embeddings = []
         skipped = 0
 
-        messages = Message.objects.filter(embedding__isnull=True)
+        messages = Message.objects.filter(embedding__isnull=True).only("message_id", "text")
         if not messages.exists():
             print("⚠️ No messages found without embeddings.")
             return []
 
-        for msg in messages:
+        pending = {}
+        items = []
+        for msg in messages.iterator(chunk_size=2000):
             msg_id = msg.message_id
             raw_text = msg.text or ""
             if not isinstance(raw_text, str) or not raw_text.strip():
@@ -141,44 +255,29 @@ class Tokenizer:
                 skipped += 1
                 continue
 
-            clean_text = self.truncate_text(stripped_text)
-
-            payload = {
-                "model": self.model,
-                "task": self.task,
-                "input": [{"text": clean_text}],
-            }
-
-            try:
-                resp = requests.post(self.jina_url, headers=self.headers, json=payload)
-                resp.raise_for_status()
-                data = resp.json().get("data", [])
-                if not data:
-                    print(f"❌ No embedding returned for message ID: {msg_id}")
-                    continue
+            clean_text, n_tokens = self.prepare_text(stripped_text)
+            pending[msg_id] = (msg, clean_text)
+            items.append((msg_id, clean_text, n_tokens))
 
-                embedding = data[0]["embedding"]
-                # enforce consistent embedding dimension
-                if self.expected_dim is None:
-                    self.expected_dim = len(embedding)
-                    print(f"ℹ️ Expecting embedding dim = {self.expected_dim}")
-                elif len(embedding) != self.expected_dim:
-                    print(f"⚠️ Skipping message ID {msg_id}: dim {len(embedding)} ≠ {self.expected_dim}")
-                    skipped += 1
-                    continue
+        for _, results, failed in self.embed_batches(items):
+            for msg_id, error in failed:
+                print(f"❌ Error embedding message ID {msg_id}: {error}")
+                skipped += 1
 
+            updated = []
+            for msg_id, embedding in results.items():
+                msg, clean_text = pending.pop(msg_id)
                 msg.embedding = embedding
-                msg.save(update_fields=["embedding"])
-
+                updated.append(msg)
                 embeddings.append(
                     {"message_id": msg_id, "embedding": embedding, "text": clean_text}
                 )
-                print(f"✅ Embedded message ID: {msg_id}")
+            for msg_id, _ in failed:
+                pending.pop(msg_id, None)
 
-            except Exception as e:
-                print(f"❌ Error embedding message ID {msg_id}: {e}")
-                skipped += 1
-                continue
+            if updated:
+                Message.objects.bulk_update(updated, ["embedding"], batch_size=self.batch_size)
+            print(f"✅ Embedded batch of {len(updated)} messages ({len(failed)} failed)")
 
         if self.output_path:
             try:
@@ -188,7 +287,9 @@ class Tokenizer:
             except Exception as e:
                 print(f"❌ Failed to save embeddings file: {e}")
 
+        self.cache.evict()
         print(f"\n🎯 Embedding complete — Total: {len(embeddings)} | Skipped: {skipped}")
+        print(f"🗄️ Embedding cache: {self.cache.stats()}")
         return embeddings
 
     def embed_and_store_faqs(self, faq_items):
@@ -200,6 +301,8 @@ class Tokenizer:
         skipped = 0
         failed = []
 
+        items = []
+        answers = {}
         for i, faq in enumerate(faq_items, 1):
             question = (faq.get("question") or "").strip()
             answer   = (faq.get("answer")   or "").strip()
@@ -207,41 +310,37 @@ class Tokenizer:
                 print(f"⚠️ Skipping FAQ #{i} — missing question or answer")
                 skipped += 1
                 continue
-
-            payload = {"model": self.model, "task": self.task, "input": [{"text": question}]}
-            try:
-                resp = requests.post(self.jina_url, headers=self.headers, json=payload)
-                resp.raise_for_status()
-                data = resp.json().get("data", [])
-                if not data:
-                    raise Exception("No embedding returned")
-
-                embedding = data[0]["embedding"]
-                # enforce consistent embedding dimension
-                if self.expected_dim is None:
-                    self.expected_dim = len(embedding)
-                    print(f"ℹ️ Expecting embedding dim = {self.expected_dim}")
-                elif len(embedding) != self.expected_dim:
-                    print(f"⚠️ Skipping FAQ #{i} — dim {len(embedding)} ≠ expected {self.expected_dim}")
-                    skipped += 1
+            answers[i] = (question, answer)
+            clean_question, n_tokens = self.prepare_text(question)
+            items.append((i, clean_question, n_tokens))
+
+        for _, results, batch_failed in self.embed_batches(items):
+
+            for i, error in batch_failed:
+                question = answers[i][0]
+                print(f"❌ Error embedding FAQ #{i}: {question[:50]} | {error}")
+                failed.append({"question": question, "error": error})
+
+            for i, embedding in results.items():
+                question, answer = answers[i]
+                try:
+                    faq_obj, created = FAQ.objects.update_or_create(
+                        question=question,
+                        defaults={"answer": answer, "embedding": embedding},
+                    )
+                except Exception as e:
+                    print(f"❌ Error storing FAQ #{i}: {question[:50]} | {e}")
+                    failed.append({"question": question, "error": str(e)})
                     continue
-
-                faq_obj, created = FAQ.objects.update_or_create(
-                    question=question,
-                    defaults={"answer": answer, "embedding": embedding},
-                )
                 action = "Created" if created else "Updated"
                 print(f"✅ {action} FAQ #{i}: {question[:50]}")
                 embedded_count += 1
 
-            except Exception as e:
-                print(f"❌ Error embedding FAQ #{i}: {question[:50]} | {e}")
-                failed.append({"question": question, "error": str(e)})
-
+        self.cache.evict()
         print(f"\n🎯 Finished embedding {embedded_count} FAQs (skipped {skipped}, failed {len(failed)})")
+        print(f"🗄️ Embedding cache: {self.cache.stats()}")
         if failed:
             print(f"❌ Failed FAQs: {len(failed)}")
             for f in failed[:3]:
                 print(f"  - Question: {f['question'][:50]} | Error: {f['error']}")
         return embedded_count, failed
-
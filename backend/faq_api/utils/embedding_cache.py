@@ -0,0 +1,100 @@
+# backend/faq_api/utils/embedding_cache.py
+import hashlib
+import unicodedata
+from django.conf import settings
+from django.utils.timezone import now
+from faq_api.models import EmbeddingCacheEntry
+
+
+def normalize_text(text):
+    """Normalize unicode and collapse whitespace so trivial variants share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(model, task, max_tokens, text):
+    raw = "\x1f".join([model, task, str(max_tokens), normalize_text(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache backed by EmbeddingCacheEntry.
+    Bounded to max_entries rows, evicting the least recently used rows.
+    The bound is checked every EVICT_EVERY stored rows during long runs,
+    and callers call evict() once at the end of a run.
+    """
+
+    LOOKUP_CHUNK = 1000
+    # rows stored between two eviction checks; each check counts the whole table
+    EVICT_EVERY = 2000
+
+    def __init__(self, max_entries=None, enabled=None):
+        self.max_entries = max_entries or settings.EMBEDDING_CACHE_MAX_ENTRIES
+        self.enabled = settings.EMBEDDING_CACHE_ENABLED if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self._since_evict = 0
+
+    def get_many(self, keys):
+        """Return {key: embedding} for the cached keys and refresh their LRU timestamp."""
+        keys = list(dict.fromkeys(keys))
+        if not self.enabled:
+            self.misses += len(keys)
+            return {}
+
+        found = {}
+        for i in range(0, len(keys), self.LOOKUP_CHUNK):
+            chunk = keys[i:i + self.LOOKUP_CHUNK]
+            rows = EmbeddingCacheEntry.objects.filter(key__in=chunk).values_list("key", "embedding")
+            hit = dict(rows)
+            if hit:
+                EmbeddingCacheEntry.objects.filter(key__in=list(hit)).update(last_used_at=now())
+            found.update(hit)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, model, embeddings):
+        """Store {key: embedding}; every EVICT_EVERY stored rows, evict old rows over the bound."""
+        if not self.enabled or not embeddings:
+            return
+        timestamp = now()
+        EmbeddingCacheEntry.objects.bulk_create(
+            [
+                EmbeddingCacheEntry(key=key, model=model, embedding=embedding, last_used_at=timestamp)
+                for key, embedding in embeddings.items()
+            ],
+            ignore_conflicts=True,
+        )
+        self.stored += len(embeddings)
+        self._since_evict += len(embeddings)
+        if self._since_evict >= self.EVICT_EVERY:
+            self._since_evict = 0
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used rows over max_entries."""
+        self._since_evict = 0
+        if not self.enabled:
+            return
+        excess = EmbeddingCacheEntry.objects.count() - self.max_entries
+        if excess <= 0:
+            return
+        stale = list(
+            EmbeddingCacheEntry.objects.order_by("last_used_at").values_list("key", flat=True)[:excess]
+        )
+        deleted, _ = EmbeddingCacheEntry.objects.filter(key__in=stale).delete()
+        self.evicted += deleted
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stored": self.stored,
+            "evicted": self.evicted,
+        }
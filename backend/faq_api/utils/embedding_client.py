@@ -0,0 +1,135 @@
+# backend/faq_api/utils/embedding_client.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from faq_api.utils.rate_limit import AdaptiveThrottle, backoff_delay, retry_after_seconds
+
+
+# Rejections that can be caused by a single input, so retrying each half of the batch may help
+PAYLOAD_ERROR_STATUSES = {400, 413, 422}
+
+
+class EmbeddingRequestError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def splittable(self):
+        """Whether the API rejected the payload itself, rather than being unavailable or refusing the key."""
+        return self.status in PAYLOAD_ERROR_STATUSES
+
+
+class EmbeddingNetworkError(EmbeddingRequestError):
+    """The endpoint stayed unreachable through every retry; splitting the batch would not help."""
+
+
+class JinaEmbeddingClient:
+    """
+    Thread-pool embedding engine for the Jina embeddings endpoint.
+    All requests share one keep-alive session, at most `concurrency`
+    requests are in flight, and 429s pause every worker adaptively.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        url,
+        api_key,
+        model="jina-embeddings-v4",
+        task="text-matching",
+        concurrency=4,
+        max_retries=5,
+        timeout=60,
+    ):
+        self.url = url
+        self.model = model
+        self.task = task
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.throttle = AdaptiveThrottle()
+        self.requests_sent = 0
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        })
+
+    def embed(self, texts):
+        """Embed a list of texts in one request and return vectors in input order."""
+        payload = {
+            "model": self.model,
+            "task": self.task,
+            "input": [{"text": text} for text in texts],
+        }
+        for attempt in range(self.max_retries + 1):
+            self.throttle.wait()
+            with self._lock:
+                self.requests_sent += 1
+            try:
+                resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # transient network errors are retried, not answered by splitting the batch
+                if attempt >= self.max_retries:
+                    raise EmbeddingNetworkError(f"Network error after {self.max_retries} retries: {e}")
+                delay = backoff_delay(attempt)
+                print(f"⚠️ Jina request failed ({type(e).__name__}) — retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if resp.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                if resp.status_code == 429:
+                    delay = self.throttle.on_rate_limited(retry_after_seconds(resp))
+                    print(f"⚠️ Jina rate-limited — pausing {delay:.1f}s (attempt {attempt + 1})")
+                else:
+                    delay = backoff_delay(attempt)
+                    print(f"⚠️ Jina returned {resp.status_code} — retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                continue
+
+            if resp.status_code >= 400:
+                # also reached when a retry status (429/5xx) outlasts every retry
+                raise EmbeddingRequestError(f"{resp.status_code} - {resp.text[:200]}", status=resp.status_code)
+
+            self.throttle.on_success()
+            data = resp.json().get("data", [])
+            if len(data) != len(texts):
+                raise EmbeddingRequestError(f"Expected {len(texts)} embeddings, got {len(data)}")
+            data = sorted(data, key=lambda item: item.get("index", 0))
+            return [item["embedding"] for item in data]
+
+        raise EmbeddingRequestError(f"Gave up after {self.max_retries} retries")
+
+    def map_concurrent(self, fn, items):
+        """
+        Apply fn to each item on the worker pool, keeping at most
+        2 × concurrency items in flight, and yield (item, result) pairs
+        as they complete.
+        """
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            in_flight = {}
+            for item in items:
+                in_flight[executor.submit(fn, item)] = item
+                if len(in_flight) >= self.concurrency * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield in_flight.pop(future), future.result()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield in_flight.pop(future), future.result()
+
+    def close(self):
+        self.session.close()
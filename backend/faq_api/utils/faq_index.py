@@ -0,0 +1,135 @@
+# backend/faq_api/utils/faq_index.py
+import uuid
+from collections import Counter
+import numpy as np
+from django.core.cache import cache
+from faq_api.models import FAQ
+
+FAQ_INDEX_VERSION_KEY = "faq_index_version"
+
+_index = None
+_index_version = None
+
+
+class FAQIndex:
+    """
+    In-memory FAQ vector index: a pre-normalized float32 matrix of FAQ
+    embeddings. Top-k queries for a batch of vectors are answered with one
+    matrix multiply plus argpartition.
+    """
+
+    QUERY_CHUNK = 1024
+
+    def __init__(self, faq_ids, vectors, faqs=None):
+        self.faq_ids = np.asarray(faq_ids)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(self.faq_ids), -1)
+        self.matrix = normalize_rows(matrix)
+        self.faqs = faqs or {}
+
+    @classmethod
+    def from_db(cls):
+        rows = list(FAQ.objects.exclude(embedding=None).values_list("id", "embedding"))
+        if not rows:
+            return cls([], np.zeros((0, 0), dtype=np.float32))
+
+        # keep only the dominant dimension, mirroring Tokenizer's uniform-dim check
+        dim = Counter(len(emb) for _, emb in rows).most_common(1)[0][0]
+        skipped = [faq_id for faq_id, emb in rows if len(emb) != dim]
+        if skipped:
+            print(f"⚠️ Skipping {len(skipped)} FAQs with embedding dim ≠ {dim}: {skipped[:5]}")
+        rows = [(faq_id, emb) for faq_id, emb in rows if len(emb) == dim]
+
+        faq_ids = [faq_id for faq_id, _ in rows]
+        faqs = FAQ.objects.defer("embedding").in_bulk(faq_ids)
+        return cls(faq_ids, [emb for _, emb in rows], faqs)
+
+    def __len__(self):
+        return len(self.faq_ids)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1] if len(self) else 0
+
+    def search(self, query_vectors, top_n=5):
+        """
+        query_vectors: array-like of shape (n, dim)
+        Returns a list (one per query) of [(faq_id, similarity), ...] sorted
+        by descending cosine similarity.
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        if not len(self) or not len(queries):
+            return [[] for _ in range(len(queries))]
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Query dim {queries.shape[1]} ≠ index dim {self.dim}")
+
+        k = min(top_n, len(self))
+        results = []
+        for start in range(0, len(queries), self.QUERY_CHUNK):
+            sims = normalize_rows(queries[start:start + self.QUERY_CHUNK]) @ self.matrix.T
+            if k < sims.shape[1]:
+                top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(sims.shape[1]), sims.shape)
+            top_sims = np.take_along_axis(sims, top, axis=1)
+            order = np.argsort(-top_sims, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_sims = np.take_along_axis(top_sims, order, axis=1)
+            for idx_row, sim_row in zip(top, top_sims):
+                results.append([
+                    (int(self.faq_ids[i]), float(sim)) for i, sim in zip(idx_row, sim_row)
+                ])
+        return results
+
+    def pair_similarity(self, query_vectors, faq_ids):
+        """
+        Cosine similarity of each query vector to one given FAQ (parallel
+        lists); NaN where the FAQ is not in the index.
+        """
+        rows = {int(faq_id): i for i, faq_id in enumerate(self.faq_ids)}
+        sims = np.full(len(faq_ids), np.nan, dtype=np.float32)
+        known = [n for n, faq_id in enumerate(faq_ids) if faq_id in rows]
+        if not known:
+            return sims
+        queries = normalize_rows(np.asarray([query_vectors[n] for n in known], dtype=np.float32))
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Query dim {queries.shape[1]} ≠ index dim {self.dim}")
+        targets = self.matrix[[rows[faq_ids[n]] for n in known]]
+        sims[known] = np.einsum("ij,ij->i", queries, targets)
+        return sims
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def invalidate_faq_index():
+    """Mark every worker's cached FAQ index as stale."""
+    try:
+        cache.set(FAQ_INDEX_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        print(f"⚠️ Could not bump FAQ index version: {e}")
+
+
+def get_faq_index(refresh=False):
+    """
+    Return this process's FAQ index, rebuilding it when FAQs changed
+    (tracked through a shared version key) or when refresh=True.
+    """
+    global _index, _index_version
+
+    try:
+        version = cache.get(FAQ_INDEX_VERSION_KEY)
+    except Exception:
+        version = _index_version
+
+    if refresh or _index is None or version != _index_version:
+        _index = FAQIndex.from_db()
+        _index_version = version
+        print(f"📚 Built FAQ index: {len(_index)} FAQs, dim={_index.dim}")
+    return _index
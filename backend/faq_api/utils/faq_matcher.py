@@ -1,27 +1,29 @@
 # backend/faq_api/utils/faq_matcher.py
-import numpy as np
-from groq import Groq
-from scipy.spatial.distance import cosine
-from faq_api.models import FAQ
+import json
+import re
+from django.conf import settings
+from faq_api.utils.faq_index import get_faq_index
+from faq_api.utils.cluster_sampling import get_encoding, truncate_tokens
+from faq_api.utils.llm_cache import CachedCompletionMixin, LLMResponseCache
+from faq_api.utils.llm_scheduler import get_groq_client, get_scheduler
 
-def cosine_similarity(vec1, vec2):
-    return 1 - cosine(vec1, vec2)
+def find_top_faqs_batch(message_embeddings, top_n=5, index=None):
+    """Top-n FAQ candidates for each message embedding, via the shared FAQ index."""
+    if index is None:
+        index = get_faq_index()
+    return [
+        [
+            {"faq_id": faq_id, "similarity": sim, "faq": index.faqs[faq_id]}
+            for faq_id, sim in hits
+        ]
+        for hits in index.search(message_embeddings, top_n=top_n)
+    ]
 
-def find_top_faqs(message_embedding, top_n=5):
-    faqs = FAQ.objects.exclude(embedding=None)
-    similarities = []
+def find_top_faqs(message_embedding, top_n=5, index=None):
+    return find_top_faqs_batch([message_embedding], top_n=top_n, index=index)[0]
 
-    for faq in faqs:
-        try:
-            sim = cosine_similarity(message_embedding, faq.embedding)
-            similarities.append({"faq_id": faq.id, "similarity": sim, "faq": faq})
-        except Exception as e:
-            print(f"⚠️ Skipping FAQ ID {faq.id} due to error: {e}")
-
-    similarities.sort(key=lambda x: x["similarity"], reverse=True)
-    return similarities[:top_n]
 def rerank_with_gpt(message_text, faq_candidates, groq_api_key):
-    client = Groq(api_key=groq_api_key)
+    client = get_groq_client(groq_api_key)
 
     prompt = (
         f"You are an AI assistant. Your job is to find the most relevant FAQ from the list below "
@@ -36,7 +38,8 @@ def rerank_with_gpt(message_text, faq_candidates, groq_api_key):
         prompt += f"{i}. Q: {faq.question}\n   A: {faq.answer}\n"
 
     try:
-        response = client.chat.completions.create(
+        response = get_scheduler().chat(
+            client,
             model="llama3-70b-8192",
             messages=[{"role": "user", "content": prompt}],
             temperature=0,
@@ -51,3 +54,201 @@ def rerank_with_gpt(message_text, faq_candidates, groq_api_key):
     except Exception as e:
         print(f"❌ Groq rerank failed: {e} — fallback to top FAQ candidate")
         return faq_candidates[0]["faq"].id
+
+
+RERANK_SYSTEM_PROMPT = (
+    "You match customer support messages to FAQs. For every numbered message, "
+    "pick the FAQ from its own candidate list that best answers it."
+)
+
+# tokens reserved per message for its line in the prompt and its entry in the answer
+MESSAGE_OVERHEAD_TOKENS = 16
+OUTPUT_TOKENS_PER_MESSAGE = 14
+MAX_MESSAGE_TOKENS = 300
+
+SELECTION_LINE_RE = re.compile(r"M(\d+)\W+F(\d+)", re.IGNORECASE)
+
+
+class FAQReranker(CachedCompletionMixin):
+    """
+    Batched counterpart of rerank_with_gpt. Messages whose top cosine
+    candidate beats the runner-up by at least `margin` skip the LLM; the
+    rest are grouped (by top candidate, so groups share FAQs) and each
+    group is one prompt that lists its candidate FAQ pool once and asks
+    for one FAQ per message. A missing or invalid selection falls back to
+    the message's top cosine candidate, like rerank_with_gpt does.
+    """
+
+    # Bump a template's version when its prompt or parsing changes to invalidate cached answers
+    PROMPT_VERSIONS = {"rerank_batch": 1}
+
+    def __init__(self, groq_api_key, model="llama3-70b-8192", margin=None, group_size=None,
+                 prompt_token_budget=None, answer_tokens=None, use_cache=None):
+        self.client = get_groq_client(groq_api_key)
+        self.model = model
+        self.llm_cache = LLMResponseCache(enabled=use_cache)
+        self.margin = settings.RERANK_MARGIN if margin is None else margin
+        self.group_size = group_size or settings.RERANK_GROUP_SIZE
+        self.prompt_token_budget = prompt_token_budget or settings.RERANK_PROMPT_TOKEN_BUDGET
+        self.answer_tokens = answer_tokens or settings.RERANK_ANSWER_TOKENS
+        self.encoding = get_encoding()
+        self._faq_entries = {}
+        self.stats = {"gated": 0, "llm_messages": 0, "calls": 0, "fallbacks": 0}
+
+    def _chat(self, **kwargs):
+        """Groq chat completion through the shared LLM scheduler (budget, concurrency, retries)."""
+        return get_scheduler().chat(self.client, **kwargs)
+
+    def is_clear_winner(self, candidates):
+        if len(candidates) < 2:
+            return True
+        return candidates[0]["similarity"] - candidates[1]["similarity"] >= self.margin
+
+    def faq_entry(self, faq):
+        """Prompt text of one FAQ (answer truncated) and its token count, computed once per FAQ."""
+        if faq.id not in self._faq_entries:
+            answer, _ = truncate_tokens(faq.answer or "", self.answer_tokens, self.encoding)
+            entry = f"Q: {faq.question}\n   A: {answer}"
+            self._faq_entries[faq.id] = (entry, len(self.encoding.encode(entry)))
+        return self._faq_entries[faq.id]
+
+    def plan_groups(self, items):
+        """
+        Split (index, text, candidates) items into prompt groups of at most
+        group_size messages whose texts plus candidate pool fit the prompt
+        token budget. Items are ordered by top candidate first so messages
+        about the same FAQ share a pool. Long texts are truncated.
+        """
+        items = sorted(items, key=lambda item: (item[2][0]["faq_id"], item[0]))
+        groups, current, pool, used = [], [], set(), 0
+        for i, text, candidates in items:
+            text, n_tokens = truncate_tokens(text, MAX_MESSAGE_TOKENS, self.encoding)
+            cost = n_tokens + MESSAGE_OVERHEAD_TOKENS + OUTPUT_TOKENS_PER_MESSAGE
+            faq_ids = {c["faq_id"] for c in candidates}
+            pool_cost = sum(self.faq_entry(c["faq"])[1] for c in candidates if c["faq_id"] not in pool)
+            if current and (len(current) >= self.group_size or used + cost + pool_cost > self.prompt_token_budget):
+                groups.append(current)
+                current, pool, used = [], set(), 0
+                pool_cost = sum(self.faq_entry(c["faq"])[1] for c in candidates)
+            current.append((i, text, candidates))
+            pool |= faq_ids
+            used += cost + pool_cost
+        if current:
+            groups.append(current)
+        return groups
+
+    def batch_prompt(self, group):
+        """Prompt for one group and the FAQ label -> faq_id mapping it uses."""
+        labels, faq_lines = {}, []
+        for _, _, candidates in group:
+            for c in candidates:
+                if c["faq_id"] not in labels:
+                    labels[c["faq_id"]] = f"F{len(labels) + 1}"
+                    faq_lines.append(f"{labels[c['faq_id']]}. {self.faq_entry(c['faq'])[0]}")
+
+        message_lines = []
+        for n, (_, text, candidates) in enumerate(group, start=1):
+            options = ", ".join(labels[c["faq_id"]] for c in candidates)
+            message_lines.append(f'M{n}. "{text}" (candidates: {options})')
+
+        prompt = (
+            "FAQs:\n" + "\n".join(faq_lines) + "\n\n"
+            "Messages:\n" + "\n".join(message_lines) + "\n\n"
+            "For each message choose the single most relevant FAQ among its own candidates.\n"
+            "Respond with a JSON array only, one object per message, in order:\n"
+            '[{"message": "M1", "faq": "F3"}, ...]'
+        )
+        return prompt, {label: faq_id for faq_id, label in labels.items()}
+
+    @staticmethod
+    def parse_batch(content, count):
+        """
+        Parse a batch answer into {message position: FAQ label number}
+        (both 1-based). Accepts a JSON array of {"message", "faq"} objects,
+        a JSON object keyed by message, or "M1: F3" style lines.
+        """
+        parsed = {}
+        match = re.search(r"(\[.*\]|\{.*\})", content, re.DOTALL)
+        if match:
+            try:
+                data = json.loads(match.group(1))
+            except ValueError:
+                data = None
+
+            if isinstance(data, dict):
+                data = [{"message": k, "faq": v} for k, v in data.items()]
+            if isinstance(data, list):
+                for item in data:
+                    if not isinstance(item, dict):
+                        continue
+                    try:
+                        n = int(str(item.get("message", "")).strip().lstrip("Mm"))
+                        f = int(str(item.get("faq", "")).strip().lstrip("Ff"))
+                    except ValueError:
+                        continue
+                    parsed[n] = f
+
+        if not parsed:
+            for n, f in SELECTION_LINE_RE.findall(content):
+                parsed.setdefault(int(n), int(f))
+
+        return {n: f for n, f in parsed.items() if 1 <= n <= count}
+
+    def _rerank_group(self, group):
+        """One chat completion for a planned group; {position: faq_id}, or None if the call failed."""
+        prompt, label_to_faq = self.batch_prompt(group)
+        messages = [
+            {"role": "system", "content": RERANK_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+
+        def selections(content):
+            chosen = {}
+            for n, f in self.parse_batch(content, len(group)).items():
+                faq_id = label_to_faq.get(f"F{f}")
+                if faq_id is not None and any(c["faq_id"] == faq_id for c in group[n - 1][2]):
+                    chosen[n] = faq_id
+            return chosen
+
+        try:
+            content = self._complete(
+                "rerank_batch",
+                messages,
+                validate=lambda c: len(selections(c)) == len(group),
+                temperature=0,
+                max_tokens=len(group) * OUTPUT_TOKENS_PER_MESSAGE + 32,
+            )
+            return selections(content)
+        except Exception as e:
+            print(f"❌ Groq batch rerank failed for {len(group)} messages: {e} — fallback to top FAQ candidates")
+            return None
+
+    def rerank(self, texts, candidate_lists):
+        """
+        Chosen faq_id per message, in input order (None when a message has
+        no candidates). candidate_lists are find_top_faqs_batch results.
+        """
+        results = [None] * len(texts)
+        pending = []
+        for i, (text, candidates) in enumerate(zip(texts, candidate_lists)):
+            if not candidates:
+                continue
+            if not text or self.is_clear_winner(candidates):
+                self.stats["gated"] += 1
+                results[i] = candidates[0]["faq_id"]
+            else:
+                pending.append((i, text, candidates))
+        self.stats["llm_messages"] += len(pending)
+
+        groups = self.plan_groups(pending)
+        answers = get_scheduler().map(self._rerank_group, groups)
+        # counted here, not in _rerank_group, which runs on the scheduler's threads
+        self.stats["calls"] += len(groups)
+        for group, chosen in zip(groups, answers):
+            for n, (i, _, candidates) in enumerate(group, start=1):
+                if chosen and n in chosen:
+                    results[i] = chosen[n]
+                else:
+                    self.stats["fallbacks"] += 1
+                    results[i] = candidates[0]["faq_id"]
+        return results
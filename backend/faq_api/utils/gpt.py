@@ -1,26 +1,127 @@
 # backend/faq_api/utils/gpt.py
 import json
-from groq import Groq, RateLimitError
-from tenacity import (
-    retry,
-    wait_exponential,
-    stop_after_attempt,
-    retry_if_exception_type,
-)
-
-class GPTFAQAnalyzer:
-    def __init__(self, groq_api_key, model="llama3-70b-8192"):
-        self.client = Groq(api_key=groq_api_key)
+import re
+from django.conf import settings
+from groq import RateLimitError
+from faq_api.utils.llm_cache import CachedCompletionMixin, LLMResponseCache
+from faq_api.utils.llm_scheduler import get_groq_client, get_scheduler
+from faq_api.utils.local_sentiment import get_local_sentiment_model
+from faq_api.utils.sentiment import SENTIMENT_LABELS, normalize_label
+
+
+def strip_code_fence(content):
+    """Remove a surrounding markdown code block (```json ... ```) from a model answer."""
+    if content.startswith("```") and content.endswith("```"):
+        content = content.strip("` \n")
+        if content.startswith("json"):
+            content = content[4:].strip()
+    return content
+
+
+def is_json(content, expected_type=dict):
+    try:
+        return isinstance(json.loads(strip_code_fence(content)), expected_type)
+    except ValueError:
+        return False
+
+
+COVERAGE_LABELS = ("Fully", "Partially", "Not")
+
+# Field -> short description, rendered into the analyze_cluster prompt
+CLUSTER_ANALYSIS_FIELDS = {
+    "label": '"Fully" | "Partially" | "Not" — how well the FAQ covers these messages',
+    "score": "integer 1-5 — resolution quality of the FAQ (5 = excellent)",
+    "reason": "string — one-sentence explanation of label and score",
+    "sentiment": '"Positive" | "Neutral" | "Negative" — sentiment of the first message',
+    "summary": "string — 1-3 sentences on the key topic or issue",
+    "topic_label": 'string — 2-4 descriptive words, e.g. "Shipping Delay"',
+    "faq_suggestion": '{"question": "...", "answer": "..."} if label is "Partially" or "Not", else null',
+}
+
+
+def parse_json_object(content):
+    """First JSON object in a model answer (code fences and chatter around it are ignored), or None."""
+    if not content:
+        return None
+    content = strip_code_fence(content)
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def repair_cluster_analysis(data):
+    """
+    Validate an analyze_cluster answer against CLUSTER_ANALYSIS_FIELDS,
+    coercing near-misses ("Fully covered", "4.0", "NEGATIVE", quoted labels).
+    Returns (fields, missing) where missing lists fields that could not be
+    recovered; faq_suggestion is only required for Partially/Not coverage.
+    """
+    data = data if isinstance(data, dict) else {}
+    fields = dict.fromkeys(CLUSTER_ANALYSIS_FIELDS)
+
+    label = str(data.get("label") or "").strip().lower()
+    fields["label"] = next((c for c in COVERAGE_LABELS if label.startswith(c.lower())), None)
+
+    try:
+        score = int(round(float(data.get("score"))))
+        fields["score"] = score if 1 <= score <= 5 else None
+    except (TypeError, ValueError):
+        pass
+
+    for name in ("reason", "summary"):
+        value = data.get(name)
+        if isinstance(value, str) and value.strip():
+            fields[name] = value.strip()
+
+    sentiment = str(data.get("sentiment") or "").strip().lower()
+    if sentiment in SENTIMENT_LABELS:
+        fields["sentiment"] = sentiment
+
+    topic = data.get("topic_label")
+    if isinstance(topic, str) and topic.strip(" \"'\n"):
+        fields["topic_label"] = topic.strip(" \"'\n")[:100]
+
+    suggestion = data.get("faq_suggestion")
+    if (
+        isinstance(suggestion, dict)
+        and isinstance(suggestion.get("question"), str) and suggestion["question"].strip()
+        and isinstance(suggestion.get("answer"), str) and suggestion["answer"].strip()
+    ):
+        fields["faq_suggestion"] = {"question": suggestion["question"].strip(), "answer": suggestion["answer"].strip()}
+
+    missing = [
+        name for name, value in fields.items()
+        if value is None and not (name == "faq_suggestion" and fields["label"] == "Fully")
+    ]
+    return fields, missing
+
+
+class GPTFAQAnalyzer(CachedCompletionMixin):
+    # Bump a template's version when its prompt or parsing changes to invalidate cached answers
+    PROMPT_VERSIONS = {
+        "score_resolution": 1,
+        "get_sentiment": 1,
+        "summarize_cluster": 1,
+        "suggest_faq": 1,
+        "label_topic": 1,
+        "extract_gpt_keywords": 1,
+        "top_process_gaps": 1,
+        "analyze_cluster": 1,
+    }
+
+    def __init__(self, groq_api_key, model="llama3-70b-8192", use_cache=None, base_url=None):
+        self.client = get_groq_client(groq_api_key, base_url)
         self.model = model
+        self.llm_cache = LLMResponseCache(enabled=use_cache)
 
-    @retry(
-        retry=retry_if_exception_type(RateLimitError),
-        wait=wait_exponential(multiplier=1, min=1, max=30),
-        stop=stop_after_attempt(5),
-    )
     def _chat(self, **kwargs):
-        """Wrapper around Groq chat completion with retry on rate limits."""
-        return self.client.chat.completions.create(**kwargs)
+        """Groq chat completion through the shared LLM scheduler (budget, concurrency, retries)."""
+        return get_scheduler().chat(self.client, **kwargs)
 
     def score_resolution(self, question, faq_answer):
         prompt = f"""
@@ -42,8 +143,9 @@ Format:
 {{"label": "...", "score": ..., "reason": "..."}}
 """
         try:
-            response = self._chat(model=self.model, messages=[{"role": "user", "content": prompt}])
-            content = response.choices[0].message.content.strip()
+            content = self._complete(
+                "score_resolution", [{"role": "user", "content": prompt}], validate=is_json
+            )
         except RateLimitError as e:
             print(f"⚠️ Rate‐limited on score_resolution: {e}")
             return {"label": "Unknown", "score": 0, "reason": "rate‐limited"}
@@ -52,10 +154,7 @@ Format:
             return {"label": "Unknown", "score": 0, "reason": "API error"}
 
         # Strip markdown code block formatting
-        if content.startswith("```") and content.endswith("```"):
-            content = content.strip("` \n")
-            if content.startswith("json"):
-                content = content[4:].strip()
+        content = strip_code_fence(content)
 
         try:
             parsed = json.loads(content)
@@ -68,14 +167,19 @@ Format:
         return {"label": "Unknown", "score": 0, "reason": content}
 
     def get_sentiment(self, text):
+        local_model = get_local_sentiment_model()
+        if local_model is not None:
+            label, confidence = local_model.predict_batch([text or ""])[0]
+            if confidence >= settings.SENTIMENT_LOCAL_MIN_CONFIDENCE:
+                return label.capitalize()
+
         prompt = (
             "You are a sentiment analysis expert. Classify the following message "
             "as one of: Positive, Neutral, or Negative.\n\n"
             f"Message: \"{text}\""
         )
         try:
-            response = self._chat(model=self.model, messages=[{"role": "user", "content": prompt}])
-            return response.choices[0].message.content.strip()
+            return self._complete("get_sentiment", [{"role": "user", "content": prompt}])
         except RateLimitError as e:
             print(f"⚠️ Rate‐limited on get_sentiment: {e}")
             return "unknown"
@@ -87,8 +191,7 @@ Format:
         full_text = "\n".join([m["text"] for m in messages])
         prompt = f"Summarize the key topic or issue from the following user messages:\n\n{full_text}"
         try:
-            response = self._chat(model=self.model, messages=[{"role": "user", "content": prompt}])
-            return response.choices[0].message.content.strip()
+            return self._complete("summarize_cluster", [{"role": "user", "content": prompt}], validate=bool)
         except RateLimitError as e:
             print(f"⚠️ Rate‐limited on summarize_cluster: {e}")
             return ""
@@ -112,8 +215,9 @@ Format:
 }}
 """
         try:
-            response = self._chat(model=self.model, messages=[{"role": "user", "content": prompt}])
-            content = response.choices[0].message.content.strip()
+            content = self._complete(
+                "suggest_faq", [{"role": "user", "content": prompt}], validate=is_json
+            )
         except RateLimitError as e:
             print(f"⚠️ Rate‐limited on suggest_faq: {e}")
             return {"question": "", "answer": ""}
@@ -122,10 +226,7 @@ Format:
             return {"question": "", "answer": ""}
 
         # Strip markdown-style code blocks
-        if content.startswith("```") and content.endswith("```"):
-            content = content.strip("` \n")
-            if content.startswith("json"):
-                content = content[4:].strip()
+        content = strip_code_fence(content)
 
         try:
             parsed = json.loads(content)
@@ -150,8 +251,7 @@ Messages:
 Respond with just the label.
 """
         try:
-            response = self._chat(model=self.model, messages=[{"role": "user", "content": prompt}])
-            return response.choices[0].message.content.strip()
+            return self._complete("label_topic", [{"role": "user", "content": prompt}], validate=bool)
         except RateLimitError as e:
             print(f"⚠️ Rate‐limited on label_topic: {e}")
             return ""
@@ -176,9 +276,12 @@ Messages:
 {sample}
 """
         try:
-            response = self._chat(model=self.model, messages=[{"role": "user", "content": prompt}])
-            content = response.choices[0].message.content
-            parsed = json.loads(content)
+            content = self._complete(
+                "extract_gpt_keywords",
+                [{"role": "user", "content": prompt}],
+                validate=lambda c: is_json(c, list),
+            )
+            parsed = json.loads(strip_code_fence(content))
             return parsed if isinstance(parsed, list) else []
         except RateLimitError as e:
             print(f"⚠️ Rate‐limited on extract_gpt_keywords: {e}")
@@ -186,3 +289,69 @@ Messages:
         except Exception as e:
             print(f"❌ extract_gpt_keywords failed: {e}")
             return []
+
+    def analyze_cluster(self, messages, faq_question, faq_answer=""):
+        """
+        Resolution label/score/reason, sentiment, summary, topic label and FAQ
+        suggestion for one cluster in a single JSON call. messages should be
+        the cluster's token-budgeted sample (cluster_sampling), most
+        representative first. Fields missing from
+        the answer (after repair) fall back to the individual methods.
+        Returns the fields plus "fallbacks", the list of fields that needed one.
+        """
+        top_message = messages[0]["text"] if messages else ""
+        sample = "\n".join(f"- {m['text']}" for m in messages)
+        schema = "\n".join(f'  "{name}": {description}' for name, description in CLUSTER_ANALYSIS_FIELDS.items())
+        prompt = f"""
+You are analyzing a cluster of related customer support messages and the FAQ they were matched to.
+
+Messages (the first one is the most representative):
+{sample}
+
+Matched FAQ:
+Q: {faq_question}
+A: {faq_answer}
+
+Respond ONLY with one raw JSON object with exactly these fields. Do NOT include any markdown formatting, code blocks, or triple backticks.
+{{
+{schema}
+}}
+"""
+        content = None
+        try:
+            content = self._complete(
+                "analyze_cluster",
+                [{"role": "user", "content": prompt}],
+                validate=lambda c: not repair_cluster_analysis(parse_json_object(c))[1],
+            )
+        except RateLimitError as e:
+            print(f"⚠️ Rate‐limited on analyze_cluster: {e}")
+        except Exception as e:
+            print(f"❌ analyze_cluster failed: {e}")
+
+        fields, missing = repair_cluster_analysis(parse_json_object(content))
+
+        if {"label", "score", "reason"} & set(missing):
+            resolution, _ = repair_cluster_analysis(self.score_resolution(top_message, faq_question))
+            for name in ("label", "score", "reason"):
+                if fields[name] is None:
+                    fields[name] = resolution[name]
+            fields["label"] = fields["label"] or "Unknown"
+            fields["score"] = fields["score"] or 0
+            fields["reason"] = fields["reason"] or ""
+        if "sentiment" in missing:
+            fields["sentiment"] = normalize_label(self.get_sentiment(top_message))
+        if "summary" in missing:
+            fields["summary"] = self.summarize_cluster(messages)
+        if "topic_label" in missing:
+            fields["topic_label"] = self.label_topic(messages)
+        needs_suggestion = fields["label"] in ("Partially", "Not")
+        if "faq_suggestion" in missing and not needs_suggestion:
+            missing.remove("faq_suggestion")
+        if needs_suggestion and fields["faq_suggestion"] is None:
+            if "faq_suggestion" not in missing:
+                missing.append("faq_suggestion")
+            fields["faq_suggestion"] = self.suggest_faq(top_message)
+
+        fields["fallbacks"] = missing
+        return fields
@@ -0,0 +1,88 @@
+# backend/faq_api/utils/language.py
+import re
+from langdetect import DetectorFactory, detect_langs
+from langdetect.lang_detect_exception import LangDetectException
+
+# langdetect samples randomly; a fixed seed makes it return the same answer every run
+DetectorFactory.seed = 0
+
+# Frequent function words that are (almost) exclusive to one of the two languages
+STOPWORDS = {
+    "en": frozenset(
+        "the and is are was were you your have has with this that for not but what when "
+        "would could should please thanks thank my our can will from there their which".split()
+    ),
+    "nl": frozenset(
+        "de het een en ik je jij u uw is niet wat wij we mijn ons onze heb hebben "
+        "met voor maar ook nog wel dat deze die graag bedankt kunt wordt zijn bij".split()
+    ),
+}
+
+WORD_RE = re.compile(r"[a-z]+")
+
+
+class LanguageDetector:
+    """
+    Batch language identification. Cheap routes are tried first:
+    texts that are too short fall back to the conversation's language (or
+    the default), conversations already identified are reused, and texts
+    with a clear majority of English/Dutch stopwords skip langdetect.
+    """
+
+    def __init__(self, default="en", min_chars=20, min_stopwords=3, stopword_ratio=3.0):
+        self.default = default
+        self.min_chars = min_chars
+        self.min_stopwords = min_stopwords
+        self.stopword_ratio = stopword_ratio
+        self.by_group = {}
+        self.routes = {"short": 0, "cached": 0, "stopwords": 0, "langdetect": 0, "failed": 0}
+
+    def is_long(self, text):
+        return isinstance(text, str) and len(text.strip()) >= self.min_chars
+
+    def stopword_guess(self, text):
+        words = WORD_RE.findall(text.lower())
+        counts = {lang: sum(1 for w in words if w in stop) for lang, stop in STOPWORDS.items()}
+        best, runner_up = sorted(counts, key=counts.get, reverse=True)
+        if counts[best] >= self.min_stopwords and counts[best] >= self.stopword_ratio * max(counts[runner_up], 1):
+            return best
+        return None
+
+    def detect(self, text, group=None):
+        """Language code for one text; group (e.g. csid) shares results within a conversation."""
+        if group is not None and group in self.by_group:
+            self.routes["cached"] += 1
+            return self.by_group[group]
+
+        if not self.is_long(text):
+            self.routes["short"] += 1
+            return self.default
+
+        lang = self.stopword_guess(text)
+        if lang:
+            self.routes["stopwords"] += 1
+        else:
+            try:
+                lang = detect_langs(text)[0].lang
+                self.routes["langdetect"] += 1
+            except LangDetectException:
+                self.routes["failed"] += 1
+                return self.default
+
+        if group is not None:
+            self.by_group[group] = lang
+        return lang
+
+    def detect_batch(self, texts, groups=None):
+        """Language codes in input order. groups is an optional parallel list of conversation ids."""
+        groups = groups if groups is not None else [None] * len(texts)
+        results = [None] * len(texts)
+
+        # Long texts first, so short replies in the same conversation inherit their language
+        order = sorted(range(len(texts)), key=lambda i: not self.is_long(texts[i]))
+        for i in order:
+            results[i] = self.detect(texts[i], groups[i])
+        return results
+
+    def stats(self):
+        return dict(self.routes)
@@ -0,0 +1,153 @@
+# backend/faq_api/utils/llm_cache.py
+import hashlib
+import json
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.utils.timezone import now
+from faq_api.models import LLMCacheEntry
+from faq_api.utils.embedding_cache import normalize_text
+
+
+def prompt_key(model, template, version, request):
+    """
+    Fingerprint of one chat completion: model, prompt template name and
+    version, and the normalized messages plus sampling parameters.
+    """
+    messages = [
+        {"role": m.get("role", ""), "content": normalize_text(str(m.get("content", "")))}
+        for m in request.get("messages", [])
+    ]
+    params = {k: v for k, v in request.items() if k not in ("messages", "model")}
+    raw = json.dumps(
+        {"model": model, "template": template, "version": version, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Persistent LLM response cache backed by LLMCacheEntry. Entries expire
+    after ttl_days and the table is bounded to max_entries rows, evicting
+    the least recently used rows first. evict() runs every EVICT_EVERY
+    stored rows and once at the end of each matching and clustering run.
+    """
+
+    EVICT_EVERY = 200
+
+    def __init__(self, enabled=None, ttl_days=None, max_entries=None):
+        self.enabled = settings.LLM_CACHE_ENABLED if enabled is None else enabled
+        self.ttl = timedelta(days=ttl_days or settings.LLM_CACHE_TTL_DAYS)
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.bypassed = 0
+        self.evicted = 0
+
+    def get(self, key):
+        """Cached response text, or None. Refreshes the entry's LRU timestamp."""
+        timestamp = now()
+        content = (
+            LLMCacheEntry.objects.filter(key=key, expires_at__gt=timestamp)
+            .values_list("response", flat=True)
+            .first()
+        )
+        with self._lock:
+            if content is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        LLMCacheEntry.objects.filter(key=key).update(last_used_at=timestamp)
+        return content
+
+    def set(self, key, model, template, content):
+        timestamp = now()
+        LLMCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                "model": model,
+                "template": template,
+                "response": content,
+                "last_used_at": timestamp,
+                "expires_at": timestamp + self.ttl,
+            },
+        )
+        with self._lock:
+            self.stored += 1
+            self._since_evict += 1
+            due = self._since_evict >= self.EVICT_EVERY
+            if due:
+                self._since_evict = 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop expired rows, then the least recently used rows over max_entries."""
+        deleted, _ = LLMCacheEntry.objects.filter(expires_at__lte=now()).delete()
+        excess = LLMCacheEntry.objects.count() - self.max_entries
+        if excess > 0:
+            stale = list(LLMCacheEntry.objects.order_by("last_used_at").values_list("key", flat=True)[:excess])
+            extra, _ = LLMCacheEntry.objects.filter(key__in=stale).delete()
+            deleted += extra
+        with self._lock:
+            self.evicted += deleted
+
+    def count_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stored": self.stored,
+            "bypassed": self.bypassed,
+            "evicted": self.evicted,
+        }
+
+
+class CachedCompletionMixin:
+    """
+    _complete() for the Groq analyzers: a chat completion whose response
+    text is served from / stored in the LLM cache. Expects self._chat,
+    self.model, self.llm_cache and a PROMPT_VERSIONS dict on the class.
+    """
+
+    PROMPT_VERSIONS = {}
+
+    def _complete(self, template, messages, validate=None, bypass_cache=False, **kwargs):
+        """
+        Response text for a templated prompt. Only responses that pass
+        validate(content) (when given) are cached, so a malformed answer is
+        asked again next time instead of being replayed.
+        """
+        request = {"messages": messages, **kwargs}
+        use_cache = self.llm_cache.enabled and not bypass_cache
+        if not use_cache:
+            self.llm_cache.count_bypass()
+        else:
+            key = prompt_key(self.model, template, self.PROMPT_VERSIONS.get(template, 1), request)
+            try:
+                cached = self.llm_cache.get(key)
+            except Exception as e:
+                print(f"⚠️ LLM cache lookup failed for {template}: {e}")
+                cached = None
+            if cached is not None:
+                return cached
+
+        response = self._chat(model=self.model, **request)
+        content = response.choices[0].message.content.strip()
+
+        if use_cache and (validate is None or validate(content)):
+            try:
+                self.llm_cache.set(key, self.model, template, content)
+            except Exception as e:
+                print(f"⚠️ Could not cache {template} response: {e}")
+        return content
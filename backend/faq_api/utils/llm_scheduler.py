@@ -0,0 +1,269 @@
+# backend/faq_api/utils/llm_scheduler.py
+import collections
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from django.conf import settings
+from django.db import close_old_connections
+from groq import Groq, RateLimitError
+from faq_api.utils.rate_limit import backoff_delay
+
+BUDGET_KEY_PREFIX = "llm_budget"
+METRICS_KEY = "llm_scheduler:metrics"
+
+# Atomically charge one request and its tokens to the current minute, or refuse
+BUDGET_SCRIPT = """
+local requests = redis.call('INCR', KEYS[1])
+local tokens = redis.call('INCRBY', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[1], 120)
+redis.call('EXPIRE', KEYS[2], 120)
+if requests > tonumber(ARGV[2]) or tokens > tonumber(ARGV[3]) then
+    redis.call('DECR', KEYS[1])
+    redis.call('DECRBY', KEYS[2], ARGV[1])
+    return 0
+end
+return 1
+"""
+
+
+def redis_connection():
+    """The django-redis connection, or None when the cache backend is not Redis."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_groq_client(api_key, base_url=None):
+    """
+    One Groq client (and connection pool) per API key and process. The
+    client's own retries are off; LLMScheduler.call owns retry and backoff.
+    base_url points the client elsewhere, e.g. at StubAPIServer in benchmarks.
+    """
+    return Groq(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """Rough prompt + completion token estimate (4 characters per token) for budgeting."""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in messages or [])
+    return prompt_chars // 4 + (max_tokens or 256)
+
+
+class LLMBudget:
+    """
+    Requests- and tokens-per-minute budget in fixed one-minute windows.
+    Counters live in Redis so every worker process shares one budget; if
+    Redis is unreachable the budget is enforced per process instead.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, redis=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.redis = redis
+        self._script = redis.register_script(BUDGET_SCRIPT) if redis is not None else None
+        self._local = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def seconds_to_next_window():
+        return 60 - (time.time() % 60)
+
+    def keys(self, window):
+        return f"{BUDGET_KEY_PREFIX}:{window}:requests", f"{BUDGET_KEY_PREFIX}:{window}:tokens"
+
+    def try_acquire(self, tokens):
+        """Charge one request to the current window; False if it would exceed the budget."""
+        tokens = min(int(tokens), self.tokens_per_minute)
+        window = int(time.time() // 60)
+
+        if self._script is not None:
+            try:
+                return bool(self._script(
+                    keys=self.keys(window), args=[tokens, self.requests_per_minute, self.tokens_per_minute]
+                ))
+            except Exception as e:
+                print(f"⚠️ LLM budget in Redis unavailable — enforcing per process: {e}")
+                self._script = None
+
+        with self._lock:
+            used_requests, used_tokens = self._local.get(window, (0, 0))
+            if used_requests + 1 > self.requests_per_minute or used_tokens + tokens > self.tokens_per_minute:
+                return False
+            self._local = {window: (used_requests + 1, used_tokens + tokens)}
+            return True
+
+    def usage(self):
+        window = int(time.time() // 60)
+        if self.redis is not None:
+            try:
+                requests, tokens = self.redis.mget(self.keys(window))
+                return {"requests": int(requests or 0), "tokens": int(tokens or 0)}
+            except Exception:
+                pass
+        requests, tokens = self._local.get(window, (0, 0))
+        return {"requests": requests, "tokens": tokens}
+
+
+class LLMScheduler:
+    """
+    Central gate for every Groq chat completion. Calls run concurrently up
+    to max_concurrency and are charged to the shared per-minute budget, in
+    arrival order. Rate limits are retried here with jittered backoff.
+    """
+
+    def __init__(self, budget, max_concurrency=4, max_retries=5):
+        self.budget = budget
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+
+        self._cond = threading.Condition()
+        self._waiting = 0
+        self._in_flight = 0
+        self._counters_lock = threading.Lock()
+
+        self._latencies = collections.deque(maxlen=1000)
+        self._queue_waits = collections.deque(maxlen=1000)
+        self.counters = {"calls": 0, "errors": 0, "rate_limited": 0, "budget_waits": 0}
+
+    def count(self, name):
+        with self._counters_lock:
+            self.counters[name] += 1
+
+    def acquire(self, est_tokens):
+        """Block until a concurrency slot and budget are available for this call."""
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._in_flight >= self.max_concurrency:
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+
+        try:
+            while not self.budget.try_acquire(est_tokens):
+                self.count("budget_waits")
+                time.sleep(min(self.budget.seconds_to_next_window(), 1.0))
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def call(self, fn, est_tokens=1000):
+        """Run fn() (one LLM request) under the scheduler and return its result."""
+        for attempt in range(self.max_retries):
+            queued = time.time()
+            self.acquire(est_tokens)
+            started = time.time()
+            self._queue_waits.append(started - queued)
+            try:
+                result = fn()
+                self.count("calls")
+                self._latencies.append(time.time() - started)
+                return result
+            except RateLimitError:
+                self.count("rate_limited")
+                if attempt == self.max_retries - 1:
+                    self.count("errors")
+                    raise
+            except Exception:
+                self.count("errors")
+                raise
+            finally:
+                self.release()
+            time.sleep(backoff_delay(attempt, base=1.0, cap=30.0))
+
+    def chat(self, client, **kwargs):
+        """Scheduled client.chat.completions.create(**kwargs)."""
+        return self.call(
+            lambda: client.chat.completions.create(**kwargs),
+            est_tokens=estimate_tokens(kwargs.get("messages"), kwargs.get("max_tokens")),
+        )
+
+    def map(self, fn, items):
+        """
+        Apply fn to every item on the scheduler's thread pool and return the
+        results in input order. LLM calls made inside fn go through call(),
+        so concurrency and budget still apply; fn should handle its own errors.
+        After each item a pool thread drops its database connection if it
+        is past CONN_MAX_AGE or unusable, like Django does at the end of a
+        request; otherwise the connection is reused by the next item.
+        """
+        if threading.current_thread().name.startswith("llm"):
+            # already on a pool thread: nested maps would wait on their own pool
+            return [fn(item) for item in items]
+
+        def run(item):
+            try:
+                return fn(item)
+            finally:
+                close_old_connections()
+
+        return list(self.pool.map(run, items))
+
+    @staticmethod
+    def percentile(values, q):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    def metrics(self):
+        latencies, waits = list(self._latencies), list(self._queue_waits)
+        return {
+            **self.counters,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "latency_p50": self.percentile(latencies, 0.5),
+            "latency_p95": self.percentile(latencies, 0.95),
+            "queue_wait_p95": self.percentile(waits, 0.95),
+            "budget_window": self.budget.usage(),
+        }
+
+    def publish_metrics(self):
+        """Store this process's metrics in Redis so `manage.py llm_metrics` can show every worker."""
+        snapshot = self.metrics()
+        if self.budget.redis is not None:
+            try:
+                field = f"{socket.gethostname()}:{os.getpid()}"
+                self.budget.redis.hset(METRICS_KEY, field, json.dumps({**snapshot, "updated": time.time()}))
+                self.budget.redis.expire(METRICS_KEY, 24 * 3600)
+            except Exception as e:
+                print(f"⚠️ Could not publish LLM scheduler metrics: {e}")
+        return snapshot
+
+
+_scheduler = None
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler; rebuilt after a fork because threads do not survive it."""
+    global _scheduler, _scheduler_pid
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler_pid != os.getpid():
+            budget = LLMBudget(
+                settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE, redis=redis_connection()
+            )
+            _scheduler = LLMScheduler(budget, max_concurrency=settings.LLM_MAX_CONCURRENCY)
+            _scheduler_pid = os.getpid()
+        return _scheduler
+
+
+def set_scheduler(scheduler):
+    """Install a scheduler for this process (benchmarks, or a dedicated budget)."""
+    global _scheduler, _scheduler_pid
+    with _scheduler_lock:
+        _scheduler, _scheduler_pid = scheduler, os.getpid()
@@ -0,0 +1,133 @@
+# backend/faq_api/utils/local_sentiment.py
+import math
+import os
+import re
+from functools import lru_cache
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_LEXICON_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "sentiment_lexicon.txt"
+)
+
+NEGATORS = frozenset(
+    "not no never dont don't didnt didn't doesnt doesn't isnt isn't wasnt wasn't cannot cant can't "
+    "niet geen nooit nergens".split()
+)
+INTENSIFIERS = frozenset("very really so extremely totally zeer erg heel echt enorm super".split())
+
+# Negator + word pairs that are set phrases, not negations; both words are skipped
+NEGATED_PHRASES = frozenset({
+    ("no", "worries"), ("no", "problem"), ("no", "problems"), ("not", "problem"),
+    ("geen", "probleem"), ("geen", "zorgen"),
+})
+
+# how many following words a negator flips; punctuation ends the window earlier
+NEGATION_WINDOW = 3
+
+# words, plus clause and sentence punctuation as boundary tokens
+TOKEN_RE = re.compile(r"[a-zà-ÿ']+|[.,!?;:]")
+BOUNDARIES = frozenset(".,!?;:")
+
+
+def load_lexicon(path=None):
+    """Read "<term> <weight>" lines, skipping blank lines and # comments."""
+    lexicon = {}
+    with open(path or DEFAULT_LEXICON_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            term, weight = line.rsplit(None, 1)
+            lexicon[term.lower()] = float(weight)
+    return lexicon
+
+
+class LexiconSentimentModel:
+    """
+    Offline English/Dutch sentiment scorer for the local fast path. Sums
+    lexicon weights with negation and intensifiers, and reports a confidence
+    that grows with the amount of evidence and shrinks with mixed polarity.
+
+    Any backend plugged in through SENTIMENT_LOCAL_BACKEND must offer the same
+    predict_batch(texts) -> [(label, confidence), ...] interface.
+    """
+
+    def __init__(self, lexicon_path=None, evidence_scale=3.0):
+        self.lexicon = load_lexicon(lexicon_path)
+        self.evidence_scale = evidence_scale
+
+    def score(self, text):
+        """
+        Returns (positive evidence, negative evidence). Negation and
+        intensifiers only reach forward within the same clause.
+        """
+        positive = negative = 0.0
+        negate_until = -1
+        boost = 1.0
+        tokens = TOKEN_RE.findall(text.lower())
+        skip = set()
+        for i, word in enumerate(tokens):
+            if i in skip:
+                continue
+            if word in BOUNDARIES:
+                negate_until = -1
+                boost = 1.0
+                continue
+            if word in NEGATORS:
+                if i + 1 < len(tokens) and (word, tokens[i + 1]) in NEGATED_PHRASES:
+                    skip.add(i + 1)
+                    continue
+                negate_until = i + NEGATION_WINDOW
+                continue
+            if word in INTENSIFIERS:
+                boost = 1.5
+                continue
+
+            weight = self.lexicon.get(word)
+            if weight:
+                weight *= boost
+                if i <= negate_until:
+                    weight = -weight
+                if weight > 0:
+                    positive += weight
+                else:
+                    negative -= weight
+            boost = 1.0
+        return positive, negative
+
+    def predict(self, text):
+        positive, negative = self.score(text or "")
+        total = positive + negative
+        if not total:
+            return "neutral", 0.0
+
+        polarity = (positive - negative) / total
+        strength = 1 - math.exp(-total / self.evidence_scale)
+        if polarity > 0:
+            label = "positive"
+        elif polarity < 0:
+            label = "negative"
+        else:
+            label = "neutral"
+        return label, round(abs(polarity) * strength, 3)
+
+    def predict_batch(self, texts):
+        return [self.predict(text) for text in texts]
+
+
+@lru_cache(maxsize=None)
+def load_backend(path):
+    return import_string(path)()
+
+
+def get_local_sentiment_model():
+    """The configured local backend (SENTIMENT_LOCAL_BACKEND), or None when disabled."""
+    path = settings.SENTIMENT_LOCAL_BACKEND
+    if not path:
+        return None
+    try:
+        return load_backend(path)
+    except Exception as e:
+        print(f"⚠️ Local sentiment backend {path} unavailable — using the LLM only: {e}")
+        return None
@@ -0,0 +1,150 @@
+# backend/faq_api/utils/message_ingest.py
+import datetime
+import hashlib
+import json
+from itertools import islice
+from django.db import transaction
+from django.utils.timezone import make_aware
+from faq_api.models import Message
+
+# Columns written from a Dixa message export row
+UPSERT_FIELDS = [
+    "csid", "created_at", "author_name", "author_email", "direction", "text",
+    "from_phone_number", "to_phone_number", "duration", "to", "from_field",
+    "cc", "bcc", "is_automated_message", "voicemail_url", "recording_url",
+    "attached_files", "chat_input_question", "chat_input_answer",
+    "chat_menu_text", "form_submission",
+]
+
+
+def message_row(msg):
+    """Map one Dixa export message to Message column values (None if unusable)."""
+    msg_id = msg.get("id")
+    text = msg.get("text")
+    if not msg_id or not text:
+        return None
+    created_at = make_aware(datetime.datetime.fromtimestamp(msg["created_at"] / 1000)) if msg.get("created_at") else None
+    return {
+        "message_id": msg_id,
+        "csid": msg.get("csid"),
+        "created_at": created_at,
+        "author_name": msg.get("author_name"),
+        "author_email": msg.get("author_email"),
+        "direction": msg.get("direction"),
+        "text": text,
+        "from_phone_number": msg.get("from_phone_number"),
+        "to_phone_number": msg.get("to_phone_number"),
+        "duration": msg.get("duration"),
+        "to": msg.get("to"),
+        "from_field": msg.get("from"),
+        "cc": msg.get("cc"),
+        "bcc": msg.get("bcc"),
+        "is_automated_message": msg.get("is_automated_message"),
+        "voicemail_url": msg.get("voicemail_url"),
+        "recording_url": msg.get("recording_url"),
+        "attached_files": msg.get("attached_files"),
+        "chat_input_question": msg.get("chat_input_question"),
+        "chat_input_answer": msg.get("chat_input_answer"),
+        "chat_menu_text": msg.get("chat_menu_text"),
+        "form_submission": msg.get("formSubmission"),
+    }
+
+
+def content_hash(row):
+    payload = json.dumps(row, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MessageIngestor:
+    """
+    Bulk upsert of Dixa export messages into Message.
+    Rows are staged in chunks; each chunk costs one SELECT for the stored
+    content hashes and one INSERT ... ON CONFLICT DO UPDATE for the rows
+    that are new or whose content changed. Unchanged rows are not written.
+    """
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.stats = {
+            "received": 0,
+            "skipped": 0,
+            "inserted": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "failed": 0,
+        }
+        # Newest created_at seen in this run, used as the sync high-water mark
+        self.max_created_at = None
+        # created_at of every row that could not be written (None when the row had none)
+        self.failed_created_at = []
+
+    def ingest(self, messages):
+        """Upsert an iterable of raw Dixa messages; returns the run stats."""
+        messages = iter(messages)
+        while True:
+            chunk = list(islice(messages, self.chunk_size))
+            if not chunk:
+                break
+            self._ingest_chunk(chunk)
+        return self.stats
+
+    def _ingest_chunk(self, chunk):
+        rows = {}
+        for msg in chunk:
+            self.stats["received"] += 1
+            row = message_row(msg)
+            if row is None:
+                self.stats["skipped"] += 1
+                continue
+            rows[row["message_id"]] = row  # last occurrence wins
+            created_at = row["created_at"]
+            if created_at and (self.max_created_at is None or created_at > self.max_created_at):
+                self.max_created_at = created_at
+
+        if not rows:
+            return
+
+        existing = dict(
+            Message.objects.filter(message_id__in=list(rows)).values_list("message_id", "content_hash")
+        )
+
+        to_write = []
+        inserted = updated = 0
+        for msg_id, row in rows.items():
+            row_hash = content_hash(row)
+            if msg_id in existing:
+                if existing[msg_id] == row_hash:
+                    self.stats["unchanged"] += 1
+                    continue
+                updated += 1
+            else:
+                inserted += 1
+            # new or changed content must go through preprocessing again
+            to_write.append(Message(content_hash=row_hash, preprocess_version=None, preprocessed_at=None, language=None, **row))
+
+        if not to_write:
+            return
+
+        try:
+            self._upsert(to_write)
+            self.stats["inserted"] += inserted
+            self.stats["updated"] += updated
+        except Exception as e:
+            print(f"⚠️ Bulk upsert of {len(to_write)} messages failed ({e}) — retrying row by row")
+            for obj in to_write:
+                try:
+                    self._upsert([obj])
+                    self.stats["updated" if obj.message_id in existing else "inserted"] += 1
+                except Exception as row_error:
+                    self.stats["failed"] += 1
+                    self.failed_created_at.append(obj.created_at)
+                    print(f"❌ Failed to insert message {obj.message_id}: {row_error}")
+
+    def _upsert(self, objs):
+        with transaction.atomic():
+            Message.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=["message_id"],
+                update_fields=UPSERT_FIELDS + ["content_hash", "preprocess_version", "preprocessed_at", "language"],
+            )
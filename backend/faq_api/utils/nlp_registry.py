@@ -0,0 +1,79 @@
+# backend/faq_api/utils/nlp_registry.py
+import os
+import resource
+import threading
+import time
+import spacy
+
+SPACY_MODELS = {
+    "en": "en_core_web_sm",
+    "nl": "nl_core_news_sm",
+}
+
+# The anonymizer only reads doc.ents; these are never constructed
+EXCLUDED_COMPONENTS = ["tagger", "parser", "lemmatizer", "attribute_ruler", "morphologizer", "senter"]
+
+_models = {}
+_load_stats = {}
+_lock = threading.Lock()
+
+
+def rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is the peak (KiB on Linux), good enough where /proc is missing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def model_version(lang):
+    name = SPACY_MODELS[lang]
+    return f"{name}@{spacy.util.get_package_version(name) or 'unknown'}"
+
+
+def get_nlp(lang):
+    """
+    spaCy pipeline for a language, loaded on first use and cached for the
+    lifetime of the process. Unknown languages fall back to English.
+    """
+    lang = lang if lang in SPACY_MODELS else "en"
+    nlp = _models.get(lang)
+    if nlp is not None:
+        return nlp
+
+    with _lock:
+        if lang not in _models:
+            name = SPACY_MODELS[lang]
+            rss_before = rss_bytes()
+            start = time.time()
+            _models[lang] = spacy.load(name, exclude=EXCLUDED_COMPONENTS)
+            _load_stats[lang] = {
+                "model": model_version(lang),
+                "pipes": list(_models[lang].pipe_names),
+                "load_seconds": round(time.time() - start, 2),
+                "rss_delta_mb": round((rss_bytes() - rss_before) / 2**20, 1),
+            }
+            stats = _load_stats[lang]
+            print(
+                f"🧠 Loaded spaCy {stats['model']} in {stats['load_seconds']}s "
+                f"(+{stats['rss_delta_mb']} MB RSS, pid {os.getpid()})"
+            )
+        return _models[lang]
+
+
+def warm(langs=None):
+    """Load the given languages (default: all) so the first task does not pay for it."""
+    for lang in langs or SPACY_MODELS:
+        get_nlp(lang)
+    return report()
+
+
+def report():
+    """Per-language load time and memory of this process, for sizing worker concurrency."""
+    return {
+        "pid": os.getpid(),
+        "rss_mb": round(rss_bytes() / 2**20, 1),
+        "models": dict(_load_stats),
+    }
@@ -1,25 +1,51 @@
 #backend/faq_api/utils/preprocess.py
 import os
 import json
+import hashlib
 import re
-import spacy
-from langdetect import detect
+import multiprocessing
 from html2text import html2text
 from html import unescape
+from django.conf import settings
+from faq_api.utils.boilerplate import get_stripper
+from faq_api.utils.language import LanguageDetector
+from faq_api.utils.nlp_registry import SPACY_MODELS, get_nlp, model_version
+
+NER_LABELS = ("PERSON", "ORG", "GPE", "LOC")
+
+# Bump when the anonymization code changes in a way that should reprocess stored messages
+PREPROCESSOR_VERSION = "2"
+
+# Set in the parent right before forking a prepare pool; workers inherit it
+_pool_preprocessor = None
+
+
+def _scrub_in_worker(text):
+    return _pool_preprocessor.scrub_text(text)
+
 
 class MessagePreprocessor:
-    def __init__(self):
-        # Load English and Dutch spaCy models
-        self.nlp_models = { 
-            "en": spacy.load("en_core_web_sm"),
-            "nl": spacy.load("nl_core_news_sm")
-        }
-
-    def detect_language(self, text):
-        try:
-            return detect(text)
-        except Exception:
-            return "en"  # Fallback
+    def __init__(self, phrases_path=None):
+        # Boilerplate phrase matcher, compiled once per process from data
+        self.boilerplate = get_stripper(phrases_path or settings.BOILERPLATE_PHRASES_PATH or None)
+        # Seeded, batch language identification; spaCy pipelines come from the
+        # per-process registry and are loaded on first use
+        self.language_detector = LanguageDetector()
+
+    @property
+    def config_version(self):
+        """
+        Fingerprint of everything that determines the anonymized output:
+        code version, boilerplate phrase set and spaCy model versions.
+        Stored per message so a change triggers a controlled reprocess.
+        """
+        parts = [PREPROCESSOR_VERSION, self.boilerplate.fingerprint]
+        for lang in sorted(SPACY_MODELS):
+            parts.append(f"{lang}={model_version(lang)}")
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def detect_language(self, text, group=None):
+        return self.language_detector.detect(text, group)
 
     def clean_html(self, text):
         """Convert HTML to clean, plain text with extra post-processing."""
@@ -37,78 +63,12 @@ class MessagePreprocessor:
         text = re.sub(r'<[^>]+>', '', text)
         text = unescape(text)
         text = text.encode("ascii", "ignore").decode()
-        repetitive_phrases = [
-            r"\bkind regards\b",
-            r"\bbest regards\b",
-            r"\bmet vriendelijke groet(en)?\b",
-            r"\bthanks\b",
-            r"\bthank you\b",
-            r"\bcheers\b", # increase the list later!
-            r"\bbevestiging\b",  # confirmation
-            r"\bbedankt voor je bericht\b",  # thank you for your message
-            r"\bwe zullen zo snel mogelijk antwoorden\b",  # we will respond as soon as possible
-            r"\buw e-mail hebben ontvangen\b",  # we have received your email
-            r"\bonze excuses\b",  # our apologies
-            r"\bwe doen ons best\b",  # we do our best
-            r"\bwacht u op de komst\b",  # are you waiting for the arrival
-            r"\bautomatisch\b",  # automatic
-            r"\bgeduld\b",  # patience
-            r"\bDear Customer, This is a confirmation that we recovered your email. We will reply as soon as possible.\b",
-            r"\bDear customer, we are a bit busier at the moment and have not yet goths to your email.\b",
-            r"\bDear Customer, This is an automatic confirmation that we have recovered your email. To help you as quickly as Possible, we have already prepared Answers to frequently asked questions. Good news: as much as 95% of Questions are resolved direct -with this! Do you have a Question about the payout of your sold item? Then click here.\b",
-            r"\bThis is a confirmation that\b",
-            r"\bThank you for filling out the form via WhatsApp. This is a confirmation we received the form.\b",
-            r"\bCeci Est une Confirmation Que Nous Avons Reçu le Formular\b",
-            r"\bMerci d'avoir rempli le formulaire via WhatsApp\b",
-            r"\bCher Client, Ceci Est Une Confirmation Que Nous Avons Bien Reçu Votre e-mail\b",
-            r"\bWe will respond to your message as soon as possible\b",
-            r"\bDear, what a pity to hear that you have decided to remove your account from our platform\b",
-            r"\bDear customer, This is an automatically generated response\b",
-            r"\bDear customer, This is an automatic confirmation that we have received your email.\b",
-            r"\bGood afternoon! Thank you for your message.\b",
-            r"\b(No message text)\b",
-            r"\bAll Rights Reserved\b",
-            r"\bSent from my iPhone\b",
-            r"\bGraag gedaan!\b",
-            r"\bVerstuurd vanaf mijn iPhone\b",
-            r"\bwe are a bit busier at the moment and have not yet\b",
-            r"\b(No text, check original email if available)\b",
-            r"\bDankjewel voor je bericht aan Vintage.nl We reageren zo snel als mogelijk op je bericht.\b",
-            r"\bno, I need more help\b",
-            r"\bWe will respond to your message as soon as possible\b",
-            r"\bGoedemiddag! Dank voor je bericht. Ik heb het voor je aangepast!\b"
-            r"\bBeste, Wat jammer om te horen dat u besloten heeft uw account van ons platform te verwijderen\b",
-            r"\bGood afternoon! Thank you for your message. What a pity! I made it right and deleted your account.\b",
-            r"\bGood afternoon! Thank you for your message. What a pity! I made it right and your account has been deleted.\b",
-            r"\bHello 👋 I'm Whoppah AI, I will try to answer your questions, how can I help you today?\b",
-            r"\bGet more help\b",
-            r"\bGraag gedaan!\b",
-            r"\bWat jammer! Ik heb het in orde gemaakt en je account\b",
-            r"\bGoedemiddag! Dank voor je bericht. Ik heb de advertentie gereactiveerd!\b", #reactivate advs
-            r"\bGeneral questions about Whoppah\b",
-            r"\bGoedemiddag! Dank voor je bericht. Ik heb het voor je aangepast!\b",
-            r"\bBeste, Wat jammer om te horen dat u besloten heeft uw account van ons platform te verwijderen.\b",
-            r"\bBeste,Wat jammer om te horen dat u besloten heeft uw account van ons platform te verwijderen\b",
-            r"\bBeste, Bedankt voor uw bericht! We hebben met succes een advertentie verlengd. Fijne dag!\b",
-            r"\bGoedemiddag! Dank voor je bericht. Wat jammer dat je niets hebt vernomen! Heb je de verkoper al een Whoppah chat bericht gestuurd?\b",
-            r"\bGoedemiddag! Dank voor je bericht. Ik zie dat het item is afgeleverd maar de koper heeft aangegeven het niet in goede orde te hebben ontvangen.\b", #buyer received order not in good order
-            r"\bGoedemorgen!Dank voor je bericht. Helaas is dit geen betrouwbaar bericht, maar een scam\b", #scam,
-            r"\bBeste, Dank je wel voor je bericht! Het lijkt erop dat je de verkoper via de chat wilde beantwoorden, maar per ongeluk naar de klantenservice hebt gestuurd\b", #customer service instead of client
-            r"\bBeste,Hartelijk dank voor je bericht! Helaas bevat je e-mail geen tekst. We horen graag hoe we je verder kunnen helpen. Ik kijk uit naar je reactie!\b", #notext
-            r"\bBeste, dank je wel voor je bericht! Zou je de koper alsjeblieft via de Whoppah-chat kunnen informeren over de situatie, zodat hij ook weet wat er aan de hand is? Ik heb de bestelling inmiddels geannuleerd en de terugbetaling naar de koper in gang gezet.Ik wens je nog een fijne dag!\b",
-            r"\bThank you for filling out the form via WhatsApp. This is a confirmation we recedived the form. We will reply as soon as possible.\b",
-            r"\bI'm sorry, it seems I Couldn't Find the Right Answer for your Question. Could you Try Asking It Differently? Alternatively, I can direct you to additional help.\b"
-        ]
-        for phrase in repetitive_phrases:
-            text = re.sub(phrase, "", text, flags=re.IGNORECASE)
+        text = self.boilerplate.strip(text)
 
         return text.strip()
 
-    def anonymize_text(self, text):
-        """Clean and anonymize a text field using regex and spaCy NER."""
-        if not isinstance(text, str) or not text.strip():
-            return text
-
+    def scrub_text(self, text):
+        """HTML cleanup + regex anonymization (everything before NER)."""
         text = self.clean_html(text)
 
         # Regex-based anonymization
@@ -117,19 +77,109 @@ class MessagePreprocessor:
         text = re.sub(r'\[.*?\]\(mailto:.*?\)', '[EMAIL_LINK]', text)
         text = re.sub(r'\b\d{7,15}\b', '[PHONE]', text)
         text = re.sub(r'Verstuurd vanaf mijn \w+', '[DEVICE_SIGNATURE]', text, flags=re.IGNORECASE)
-
-        # spaCy NER-based anonymization
-        lang = self.detect_language(text)
-        lang = lang if lang in self.nlp_models else "en"
-        doc = self.nlp_models[lang](text)
-
+        return text
+
+    @staticmethod
+    def ner_language(lang):
+        """Language whose spaCy pipeline runs NER; unsupported languages use English."""
+        return lang if lang in SPACY_MODELS else "en"
+
+    def prepare_text(self, text, lang=None):
+        """
+        Scrub a text and pick the language NER should run in, detecting it
+        only when no (stored) language is given. Returns (text, lang).
+        """
+        text = self.scrub_text(text)
+        lang = lang or self.detect_language(text)
+        return text, self.ner_language(lang)
+
+    @staticmethod
+    def replace_entities(text, doc):
         anonymized = text
         for ent in reversed(doc.ents):
-            if ent.label_ in ("PERSON", "ORG", "GPE", "LOC"):
+            if ent.label_ in NER_LABELS:
                 anonymized = anonymized[:ent.start_char] + f'[{ent.label_}]' + anonymized[ent.end_char:]
-
         return anonymized
 
+    @staticmethod
+    def ner_disabled_pipes(nlp):
+        """Every component except NER and the tok2vec it listens to (if any)."""
+        keep = {"ner"}
+        for name in nlp.pipe_names:
+            component = nlp.get_pipe(name)
+            if "ner" in getattr(component, "listening_components", []):
+                keep.add(name)
+        return [name for name in nlp.pipe_names if name not in keep]
+
+    def anonymize_text(self, text, lang=None):
+        """Clean and anonymize a text field using regex and spaCy NER."""
+        if not isinstance(text, str) or not text.strip():
+            return text
+
+        text, lang = self.prepare_text(text, lang)
+
+        # spaCy NER-based anonymization
+        nlp = get_nlp(lang)
+        with nlp.select_pipes(disable=self.ner_disabled_pipes(nlp)):
+            doc = nlp(text)
+
+        return self.replace_entities(text, doc)
+
+    def anonymize_texts(self, texts, batch_size=256, n_process=1):
+        """Batched anonymize_text. Returns anonymized texts in input order."""
+        return self.anonymize_batch(texts, batch_size=batch_size, n_process=n_process)[0]
+
+    def anonymize_batch(self, texts, languages=None, groups=None, batch_size=256, n_process=1):
+        """
+        Regex cleanup runs across n_process worker processes, languages are
+        detected in one batch for texts without a known language (groups,
+        e.g. csids, share a detection per conversation), and each language
+        goes through nlp.pipe with only the NER component enabled.
+        Returns (anonymized texts, detected languages) in input order.
+        """
+        global _pool_preprocessor
+
+        results = list(texts)
+        langs = list(languages) if languages is not None else [None] * len(results)
+        groups = list(groups) if groups is not None else [None] * len(results)
+        todo = [i for i, t in enumerate(results) if isinstance(t, str) and t.strip()]
+        if not todo:
+            return results, langs
+
+        if n_process > 1 and len(todo) >= n_process * 2:
+            _pool_preprocessor = self
+            try:
+                with multiprocessing.get_context("fork").Pool(n_process) as pool:
+                    scrubbed = pool.map(_scrub_in_worker, [results[i] for i in todo], chunksize=64)
+            finally:
+                _pool_preprocessor = None
+        else:
+            scrubbed = [self.scrub_text(results[i]) for i in todo]
+
+        unknown = [j for j, i in enumerate(todo) if not langs[i]]
+        detected = self.language_detector.detect_batch(
+            [scrubbed[j] for j in unknown], groups=[groups[todo[j]] for j in unknown]
+        )
+        for j, lang in zip(unknown, detected):
+            langs[todo[j]] = lang
+
+        by_lang = {}
+        for i, text in zip(todo, scrubbed):
+            by_lang.setdefault(self.ner_language(langs[i]), []).append((i, text))
+
+        for lang, items in by_lang.items():
+            nlp = get_nlp(lang)
+            docs = nlp.pipe(
+                [text for _, text in items],
+                batch_size=batch_size,
+                n_process=n_process if len(items) >= n_process * batch_size else 1,
+                disable=self.ner_disabled_pipes(nlp),
+            )
+            for (i, text), doc in zip(items, docs):
+                results[i] = self.replace_entities(text, doc)
+
+        return results, langs
+
     def anonymize_message(self, msg):
         if isinstance(msg, str):
             print(f"⚠️ Expected dict, got string. Wrapping string in 'text' field:\n{msg}")
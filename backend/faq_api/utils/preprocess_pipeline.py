@@ -0,0 +1,93 @@
+#backend/faq_api/utils/preprocess_pipeline.py
+import logging
+import multiprocessing
+import time
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+from faq_api.models import Message
+from faq_api.utils.preprocess import MessagePreprocessor
+
+logger = logging.getLogger(__name__)
+
+
+def effective_n_process(n_process):
+    """
+    Daemonic processes (e.g. Celery prefork children) cannot fork worker
+    pools, so fall back to a single process there. Run the worker with
+    --pool=solo/threads or use `manage.py preprocess_messages` to use more cores.
+    """
+    if n_process > 1 and multiprocessing.current_process().daemon:
+        logger.warning(f"⚠️ Running in a daemonic process — using n_process=1 instead of {n_process}")
+        return 1
+    return max(1, n_process)
+
+
+def preprocess_chunk(preprocessor, messages, version, n_process=1, batch_size=256):
+    """
+    Anonymize a chunk of Message rows and bulk-write the results, stamping
+    every row with the preprocessing version so it is not selected again.
+    """
+    texts, languages = preprocessor.anonymize_batch(
+        [m.text for m in messages],
+        languages=[m.language for m in messages],
+        groups=[m.csid for m in messages],
+        batch_size=batch_size,
+        n_process=n_process,
+    )
+    timestamp = now()
+    changed = 0
+    for msg, cleaned_text, lang in zip(messages, texts, languages):
+        if cleaned_text != msg.text:
+            msg.text = cleaned_text
+            changed += 1
+        msg.language = lang
+        msg.preprocess_version = version
+        msg.preprocessed_at = timestamp
+    Message.objects.bulk_update(
+        messages, ["text", "language", "preprocess_version", "preprocessed_at"], batch_size=500
+    )
+    return changed
+
+
+def pending_messages(version, force=False):
+    """Messages never preprocessed, or preprocessed with another config version."""
+    queryset = Message.objects.all()
+    if not force:
+        queryset = queryset.filter(Q(preprocess_version__isnull=True) | ~Q(preprocess_version=version))
+    return queryset
+
+
+def run_preprocessing(force=False, chunk_size=None, n_process=None, batch_size=None):
+    """
+    Preprocess new, changed or outdated messages in keyset-paginated chunks.
+    force=True reprocesses everything. Returns (processed, cleaned).
+    """
+    chunk_size = chunk_size or settings.PREPROCESS_CHUNK_SIZE
+    batch_size = batch_size or settings.PREPROCESS_BATCH_SIZE
+    n_process = effective_n_process(n_process or settings.PREPROCESS_N_PROCESS)
+
+    preprocessor = MessagePreprocessor()
+    version = preprocessor.config_version
+    queryset = pending_messages(version, force=force).only("message_id", "text", "csid", "language").order_by("message_id")
+    logger.info(f"🧹 Preprocessing with config version {version} (force={force})")
+
+    processed = cleaned = 0
+    last_id = None
+    start = time.time()
+
+    while True:
+        page = queryset if last_id is None else queryset.filter(message_id__gt=last_id)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1].message_id
+
+        cleaned += preprocess_chunk(preprocessor, chunk, version, n_process=n_process, batch_size=batch_size)
+        processed += len(chunk)
+        rate = processed / max(time.time() - start, 1e-6)
+        logger.info(f"🧹 Preprocessed {processed} messages ({rate:.0f}/s, n_process={n_process})")
+
+    logger.info(f"🌐 Language detection routes: {preprocessor.language_detector.stats()}")
+
+    return processed, cleaned
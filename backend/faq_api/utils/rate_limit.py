@@ -0,0 +1,87 @@
+# backend/faq_api/utils/rate_limit.py
+import random
+import threading
+import time
+
+
+def retry_after_seconds(response):
+    """Return the Retry-After delay of a response in seconds, or None."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Exponential backoff with full jitter for the given (0-based) attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveThrottle:
+    """
+    Shared pause gate for concurrent callers of one rate-limited API.
+    A 429 seen by any thread pauses every thread, and the pause grows with
+    consecutive rate limits and shrinks again as requests succeed.
+    """
+
+    def __init__(self, base=1.0, cap=60.0):
+        self.base = base
+        self.cap = cap
+        self._lock = threading.Lock()
+        self._pause_until = 0.0
+        self._penalty = 0
+        self.rate_limited = 0
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._pause_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def on_rate_limited(self, retry_after=None):
+        with self._lock:
+            self.rate_limited += 1
+            delay = retry_after if retry_after is not None else backoff_delay(self._penalty, self.base, self.cap)
+            self._penalty = min(self._penalty + 1, 10)
+            self._pause_until = max(self._pause_until, time.monotonic() + delay)
+            return delay
+
+    def on_success(self):
+        with self._lock:
+            if self._penalty:
+                self._penalty -= 1
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate_per_minute` tokens are refilled evenly
+    over each minute, up to `capacity` (the allowed burst).
+    """
+
+    def __init__(self, rate_per_minute, capacity=1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        current = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (current - self._updated) * self.rate)
+        self._updated = current
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then take them."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
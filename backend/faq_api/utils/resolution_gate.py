@@ -0,0 +1,186 @@
+# backend/faq_api/utils/resolution_gate.py
+import numpy as np
+from django.conf import settings
+from faq_api.models import Message, ResolutionGateCalibration
+from faq_api.utils.gpt import COVERAGE_LABELS
+
+# gpt_reason prefix of gate-derived labels; calibration only learns from LLM labels
+GATE_REASON_PREFIX = "[similarity gate]"
+
+SAMPLE_CHUNK = 2000
+
+
+def coverage_label(raw):
+    """"Fully" / "Partially" / "Not" for a stored gpt_label, or None (Unknown, empty)."""
+    raw = str(raw or "").strip().lower()
+    return next((c for c in COVERAGE_LABELS if raw.startswith(c.lower())), None)
+
+
+def load_samples(index, limit=None):
+    """
+    (similarity, coverage label, gpt_score) arrays for matched messages with
+    an LLM resolution label; similarity is message vs. matched FAQ embedding.
+    """
+    rows = (
+        Message.objects.filter(embedding__isnull=False, matched_faq__isnull=False, gpt_label__isnull=False)
+        .exclude(gpt_reason__startswith=GATE_REASON_PREFIX)
+        .order_by("message_id")
+        .values_list("embedding", "matched_faq_id", "gpt_label", "gpt_score")
+    )
+    if limit:
+        rows = rows[:limit]
+
+    sims, labels, scores = [], [], []
+    chunk = []
+
+    def flush():
+        vectors = [embedding for embedding, _, _, _ in chunk]
+        faq_ids = [faq_id for _, faq_id, _, _ in chunk]
+        for sim, (_, _, label, score) in zip(index.pair_similarity(vectors, faq_ids), chunk):
+            label = coverage_label(label)
+            if label and not np.isnan(sim):
+                sims.append(float(sim))
+                labels.append(label)
+                scores.append(score if score and 1 <= score <= 5 else 0)
+
+    for row in rows.iterator(chunk_size=SAMPLE_CHUNK):
+        chunk.append(row)
+        if len(chunk) >= SAMPLE_CHUNK:
+            flush()
+            chunk = []
+    if chunk:
+        flush()
+    return np.asarray(sims, dtype=np.float32), np.asarray(labels), np.asarray(scores)
+
+
+def _widest_band(sims, hits, target_agreement, min_samples):
+    """
+    Length k of the longest prefix (sims already ordered from the gated end)
+    whose hit rate is at least target_agreement, or 0 if none of
+    min_samples or more qualifies.
+    """
+    precision = np.cumsum(hits) / np.arange(1, len(hits) + 1)
+    ok = np.nonzero(precision >= target_agreement)[0] + 1
+    ok = ok[ok >= min_samples]
+    return int(ok.max()) if len(ok) else 0
+
+
+def _band_score(scores):
+    scores = scores[scores > 0]
+    return int(round(float(np.median(scores)))) if len(scores) else None
+
+
+def fit_thresholds(sims, labels, scores, target_agreement=None, min_samples=None):
+    """
+    Widest similarity bands whose stored LLM labels agree with the gate at
+    target_agreement or better: similarity >= high_threshold means "Fully",
+    similarity <= low_threshold means "Not". Each band needs min_samples
+    messages, otherwise its threshold is None (that side stays on the LLM).
+    """
+    target_agreement = target_agreement or settings.RESOLUTION_GATE_TARGET_AGREEMENT
+    min_samples = min_samples or settings.RESOLUTION_GATE_MIN_SAMPLES
+    fit = {"high_threshold": None, "low_threshold": None, "high_score": None, "low_score": None}
+    if not len(sims):
+        return fit
+
+    desc = np.argsort(-sims, kind="stable")
+    k = _widest_band(sims[desc], labels[desc] == "Fully", target_agreement, min_samples)
+    if k:
+        fit["high_threshold"] = float(sims[desc][k - 1])
+        fit["high_score"] = _band_score(scores[desc][:k])
+
+    asc = desc[::-1]
+    k = _widest_band(sims[asc], labels[asc] == "Not", target_agreement, min_samples)
+    if k:
+        fit["low_threshold"] = float(sims[asc][k - 1])
+        fit["low_score"] = _band_score(scores[asc][:k])
+
+    if fit["high_threshold"] is not None and fit["low_threshold"] is not None \
+            and fit["low_threshold"] >= fit["high_threshold"]:
+        fit["low_threshold"] = fit["low_score"] = None
+    return fit
+
+
+def evaluate(sims, labels, high_threshold, low_threshold):
+    """How often gated labels agree with the stored LLM labels, and how many LLM calls the gate saves."""
+    high = sims >= high_threshold if high_threshold is not None else np.zeros(len(sims), dtype=bool)
+    low = sims <= low_threshold if low_threshold is not None else np.zeros(len(sims), dtype=bool)
+    low &= ~high
+    gated = int(high.sum() + low.sum())
+    agree = int((labels[high] == "Fully").sum() + (labels[low] == "Not").sum())
+    return {
+        "samples": len(sims),
+        "gated_high": int(high.sum()),
+        "gated_low": int(low.sum()),
+        "llm_calls_saved": gated,
+        "gated_fraction": round(gated / len(sims), 3) if len(sims) else 0.0,
+        "agreement": round(agree / gated, 3) if gated else None,
+    }
+
+
+def calibrate(index, target_agreement=None, min_samples=None, holdout=0.0, limit=None, save=True, seed=0):
+    """
+    Fit the gate on stored LLM labels and report it. With holdout > 0 that
+    fraction of samples is left out of the fit and the report covers it
+    instead of the training data.
+    """
+    target_agreement = target_agreement or settings.RESOLUTION_GATE_TARGET_AGREEMENT
+    sims, labels, scores = load_samples(index, limit=limit)
+
+    test = np.zeros(len(sims), dtype=bool)
+    if holdout > 0:
+        test = np.random.default_rng(seed).random(len(sims)) < holdout
+    fit = fit_thresholds(sims[~test], labels[~test], scores[~test], target_agreement, min_samples)
+    report = evaluate(
+        sims[test] if holdout > 0 else sims,
+        labels[test] if holdout > 0 else labels,
+        fit["high_threshold"],
+        fit["low_threshold"],
+    )
+
+    calibration = None
+    if save:
+        calibration = ResolutionGateCalibration.objects.create(
+            **fit,
+            target_agreement=target_agreement,
+            sample_size=int((~test).sum()),
+            agreement=report["agreement"],
+            gated_fraction=report["gated_fraction"],
+        )
+    label_counts = {str(label): int(n) for label, n in zip(*np.unique(labels, return_counts=True))}
+    return {**fit, **report, "label_counts": label_counts, "calibration": calibration}
+
+
+class ResolutionGate:
+    """
+    Similarity-only resolution labels for clear cases, from the latest
+    ResolutionGateCalibration. assess() returns a score_resolution-shaped
+    dict, or None when the similarity is in the ambiguous band.
+    """
+
+    def __init__(self, calibration=None, enabled=None):
+        enabled = settings.RESOLUTION_GATE_ENABLED if enabled is None else enabled
+        if enabled and calibration is None:
+            calibration = ResolutionGateCalibration.objects.order_by("-created_at").first()
+        self.calibration = calibration if enabled else None
+        self.stats = {"high": 0, "low": 0, "llm": 0}
+
+    def assess(self, similarity):
+        cal = self.calibration
+        if cal is not None and similarity is not None:
+            if cal.high_threshold is not None and similarity >= cal.high_threshold:
+                self.stats["high"] += 1
+                return {
+                    "label": "Fully covered",
+                    "score": cal.high_score or 5,
+                    "reason": f"{GATE_REASON_PREFIX} similarity {similarity:.3f} ≥ {cal.high_threshold:.3f}",
+                }
+            if cal.low_threshold is not None and similarity <= cal.low_threshold:
+                self.stats["low"] += 1
+                return {
+                    "label": "Not covered",
+                    "score": cal.low_score or 1,
+                    "reason": f"{GATE_REASON_PREFIX} similarity {similarity:.3f} ≤ {cal.low_threshold:.3f}",
+                }
+        self.stats["llm"] += 1
+        return None
@@ -1,27 +1,82 @@
 #backend/faq_api/utils/sentiment.py
-from groq import Groq, RateLimitError
-from tenacity import (
-    retry,
-    wait_exponential,
-    stop_after_attempt,
-    retry_if_exception_type,
+import json
+import re
+import tiktoken
+from django.conf import settings
+from groq import RateLimitError
+from faq_api.utils.llm_cache import CachedCompletionMixin, LLMResponseCache
+from faq_api.utils.llm_scheduler import get_groq_client, get_scheduler
+from faq_api.utils.local_sentiment import get_local_sentiment_model
+
+SENTIMENT_LABELS = ("positive", "neutral", "negative")
+
+BATCH_SYSTEM_PROMPT = (
+    "You analyze customer support sentiment. Classify every numbered message "
+    "as Positive, Neutral or Negative."
 )
 
-class SentimentAnalyzer:
-    def __init__(self, groq_api_key, model="llama3-70b-8192"):
-        self.client = Groq(api_key=groq_api_key)
+# tokens reserved per item for its output line and for the numbering/quotes around it
+OUTPUT_TOKENS_PER_ITEM = 12
+ITEM_OVERHEAD_TOKENS = 6
+
+LINE_RE = re.compile(r"^\W*(\d+)\W.*?\b(positive|neutral|negative)\b", re.IGNORECASE | re.MULTILINE)
+
+
+def normalize_label(raw):
+    """Map a free-form model answer onto positive / negative / neutral."""
+    raw = str(raw).strip().lower()
+    if "positive" in raw:
+        return "positive"
+    elif "negative" in raw:
+        return "negative"
+    return "neutral"
+
+
+class SentimentAnalyzer(CachedCompletionMixin):
+    # Bump a template's version when its prompt or parsing changes to invalidate cached answers
+    PROMPT_VERSIONS = {"sentiment": 1, "sentiment_batch": 1}
+
+    def __init__(self, groq_api_key, model="llama3-70b-8192", context_window=8192,
+                 max_batch_items=40, max_item_tokens=300, context_margin=0.8,
+                 use_local=True, local_model=None, min_confidence=None, use_cache=None):
+        self.client = get_groq_client(groq_api_key)
         self.model = model
+        self.llm_cache = LLMResponseCache(enabled=use_cache)
+        # Local CPU fast path; only predictions below the confidence gate reach the LLM
+        self.local_model = (local_model or get_local_sentiment_model()) if use_local else None
+        self.min_confidence = (
+            settings.SENTIMENT_LOCAL_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        )
+        # The model's own tokenizer differs from cl100k; context_margin absorbs the difference
+        self.context_window = context_window
+        self.context_margin = context_margin
+        self.max_batch_items = max_batch_items
+        self.max_item_tokens = max_item_tokens
+        self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.stats = {"local": 0, "llm": 0, "batch_calls": 0, "single_calls": 0, "fallbacks": 0}
 
-    @retry(
-        retry=retry_if_exception_type(RateLimitError),
-        wait=wait_exponential(multiplier=1, min=1, max=60),
-        stop=stop_after_attempt(5),
-    )
     def _chat(self, **kwargs):
-        """Wrapper around Groq chat completion with retry on rate limits."""
-        return self.client.chat.completions.create(**kwargs)
+        """Groq chat completion through the shared LLM scheduler (budget, concurrency, retries)."""
+        return get_scheduler().chat(self.client, **kwargs)
+
+    def classify_local(self, texts):
+        """Local labels for confident predictions, None for texts routed to the LLM."""
+        if self.local_model is None:
+            return [None] * len(texts)
+        labels = []
+        for label, confidence in self.local_model.predict_batch(texts):
+            labels.append(label if confidence >= self.min_confidence else None)
+        return labels
 
     def analyze(self, text):
+        label = self.classify_local([text])[0]
+        if label:
+            self.stats["local"] += 1
+            return label
+        self.stats["llm"] += 1
+        return self._analyze_llm(text)
+
+    def _analyze_llm(self, text):
         prompt = (
             "You are a sentiment analysis expert. Classify the following message "
             "as one of the following: Positive, Neutral, or Negative.\n\n"
@@ -33,15 +88,9 @@ class SentimentAnalyzer:
             {"role": "user",   "content": prompt}
         ]
 
+        self.stats["single_calls"] += 1
         try:
-            response = self._chat(model=self.model, messages=messages, temperature=0)
-            sentiment = response.choices[0].message.content.strip().lower()
-            if "positive" in sentiment:
-                return "positive"
-            elif "negative" in sentiment:
-                return "negative"
-            else:
-                return "neutral"
+            return normalize_label(self._complete("sentiment", messages, temperature=0))
 
         except RateLimitError as e:
             print(f"⚠️ Rate‐limited on sentiment analysis: {e}")
@@ -50,3 +99,140 @@ class SentimentAnalyzer:
             print(f"⚠️ Sentiment analysis failed: {e}")
             return "unknown"
 
+    def truncate(self, text, max_tokens):
+        tokens = self.encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text, len(tokens)
+        return self.encoding.decode(tokens[:max_tokens]), max_tokens
+
+    def plan_batches(self, texts):
+        """
+        Group (index, text) pairs so each prompt plus its expected output
+        fits the context window. Long messages are truncated first.
+        """
+        overhead = len(self.encoding.encode(BATCH_SYSTEM_PROMPT + self.batch_prompt([])))
+        budget = int(self.context_window * self.context_margin) - overhead
+
+        batches, current, used = [], [], 0
+        for i, text in texts:
+            text, n_tokens = self.truncate(text, self.max_item_tokens)
+            cost = n_tokens + ITEM_OVERHEAD_TOKENS + OUTPUT_TOKENS_PER_ITEM
+            if current and (used + cost > budget or len(current) >= self.max_batch_items):
+                batches.append(current)
+                current, used = [], 0
+            current.append((i, text))
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def batch_prompt(texts):
+        numbered = "\n".join(f'{n}. "{text}"' for n, text in enumerate(texts, start=1))
+        return (
+            "Classify the sentiment of each numbered customer message below "
+            "as Positive, Neutral or Negative.\n\n"
+            f"{numbered}\n\n"
+            "Respond with a JSON array only, one object per message, in order:\n"
+            '[{"id": 1, "sentiment": "Positive"}, ...]'
+        )
+
+    @staticmethod
+    def parse_batch(content, count):
+        """
+        Parse a numbered batch answer into {position: label} (1-based).
+        Accepts a JSON array of objects or bare labels, a JSON object keyed
+        by number, or "1. Positive" style lines; unparseable items are omitted.
+        """
+        parsed = {}
+        match = re.search(r"(\[.*\]|\{.*\})", content, re.DOTALL)
+        if match:
+            try:
+                data = json.loads(match.group(1))
+            except ValueError:
+                data = None
+
+            if isinstance(data, dict):
+                data = [{"id": k, "sentiment": v} for k, v in data.items()]
+            if isinstance(data, list):
+                for n, item in enumerate(data, start=1):
+                    if isinstance(item, dict):
+                        n = item.get("id", n)
+                        item = item.get("sentiment") or item.get("label")
+                    try:
+                        n = int(n)
+                    except (TypeError, ValueError):
+                        continue
+                    if isinstance(item, str) and item.strip().lower() in SENTIMENT_LABELS:
+                        parsed[n] = item.strip().lower()
+
+        if not parsed:
+            for n, label in LINE_RE.findall(content):
+                parsed.setdefault(int(n), label.lower())
+
+        return {n: label for n, label in parsed.items() if 1 <= n <= count}
+
+    def analyze_batch(self, texts):
+        """
+        Sentiment for many messages: confident local predictions first, the
+        rest with concurrent chat completions, one per context-sized batch.
+        Items missing from a parsed answer fall back to a single call; a
+        failed call marks its batch "unknown", like analyze() does.
+        Returns labels in input order.
+        """
+        results = [None] * len(texts)
+        candidates = []
+        for i, text in enumerate(texts):
+            if isinstance(text, str) and text.strip():
+                candidates.append((i, text))
+            else:
+                results[i] = "neutral"
+
+        todo = []
+        local_labels = self.classify_local([text for _, text in candidates])
+        for (i, text), label in zip(candidates, local_labels):
+            if label:
+                results[i] = label
+            else:
+                todo.append((i, text))
+        self.stats["local"] += len(candidates) - len(todo)
+        self.stats["llm"] += len(todo)
+
+        batches = self.plan_batches(todo)
+        answers = get_scheduler().map(self._classify_batch, batches)
+        # counted here, not in _classify_batch, which runs on the scheduler's threads
+        self.stats["batch_calls"] += len(batches)
+        for batch, parsed in zip(batches, answers):
+            if parsed is None:
+                for i, _ in batch:
+                    results[i] = "unknown"
+                continue
+
+            for n, (i, text) in enumerate(batch, start=1):
+                if n in parsed:
+                    results[i] = parsed[n]
+                else:
+                    self.stats["fallbacks"] += 1
+                    results[i] = self._analyze_llm(text)
+
+        return results
+
+    def _classify_batch(self, batch):
+        """One chat completion for a planned batch; {position: label}, or None if the call failed."""
+        prompt = self.batch_prompt([text for _, text in batch])
+        messages = [
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        try:
+            content = self._complete(
+                "sentiment_batch",
+                messages,
+                validate=lambda c: len(self.parse_batch(c, len(batch))) == len(batch),
+                temperature=0,
+                max_tokens=len(batch) * OUTPUT_TOKENS_PER_ITEM + 32,
+            )
+            return self.parse_batch(content, len(batch))
+        except Exception as e:
+            print(f"⚠️ Batched sentiment failed for {len(batch)} messages: {e}")
+            return None
@@ -0,0 +1,71 @@
+# backend/faq_api/utils/sync_state.py
+import datetime
+from django.conf import settings
+from django.utils.timezone import is_naive, localtime, make_aware
+from faq_api.models import SyncCursor
+
+DIXA_MESSAGES_CURSOR = "dixa_messages"
+
+
+def full_sync_start():
+    return datetime.datetime.strptime(settings.DIXA_FULL_SYNC_START, "%Y-%m-%d")
+
+
+def sync_start(name, default_start, full=False):
+    """
+    Start of the next incremental window for a cursor: the stored high-water
+    mark minus DIXA_SYNC_OVERLAP_HOURS of slack, or `default_start` when
+    there is no cursor yet. full=True ignores the cursor and starts from
+    DIXA_FULL_SYNC_START. Returns a naive local datetime, as DixaDownloader expects.
+    """
+    if full:
+        return full_sync_start()
+
+    cursor = SyncCursor.objects.filter(name=name).first()
+    if not cursor or not cursor.position:
+        return default_start
+
+    overlap = datetime.timedelta(hours=settings.DIXA_SYNC_OVERLAP_HOURS)
+    return localtime(cursor.position).replace(tzinfo=None) - overlap
+
+
+def advance_cursor(name, position):
+    """Move a cursor forward to `position` (never backwards)."""
+    if position is None:
+        return
+    cursor, _ = SyncCursor.objects.get_or_create(name=name)
+    if cursor.position is None or position > cursor.position:
+        cursor.position = position
+        cursor.save(update_fields=["position", "updated_at"])
+
+
+def checkpoint_position(max_created_at, failed_windows_start=None, failed_rows=()):
+    """
+    The high-water mark a sync run may store: max_created_at, but no later
+    than the start of the first failed window (the end of the unbroken run
+    of successful windows) or the earliest row that failed to write.
+    Returns (position, reason); position None means "leave the cursor".
+    """
+    if any(created_at is None for created_at in failed_rows):
+        return None, "a failed row has no created_at"
+
+    position, reasons = max_created_at, []
+    if failed_windows_start is not None:
+        if is_naive(failed_windows_start):
+            failed_windows_start = make_aware(failed_windows_start)
+        reasons.append(f"window from {failed_windows_start} failed")
+        position = min(position, failed_windows_start) if position else None
+    if failed_rows:
+        reasons.append(f"{len(failed_rows)} rows failed to write")
+        position = min(position, min(failed_rows)) if position else None
+    return position, "; ".join(reasons)
+
+
+def checkpoint(name, max_created_at, failed_windows_start=None, failed_rows=()):
+    """Advance a cursor after a sync run without skipping past data the run failed to store."""
+    position, reason = checkpoint_position(max_created_at, failed_windows_start, failed_rows)
+    if reason:
+        print(f"⚠️ Sync '{name}' had failures ({reason}) — cursor capped at {position}")
+    advance_cursor(name, position)
+    return position
+
@@ -0,0 +1,199 @@
+# backend/faq_api/utils/vector_store.py
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+# halfvec and its HNSW operator classes arrived in pgvector 0.7
+MIN_PGVECTOR_VERSION = (0, 7)
+
+VECTOR_TABLES = {"faq_api_faq": "faq_embedding_hnsw", "faq_api_message": "message_embedding_hnsw"}
+
+# The vector column is kept in step with `embedding` by a trigger, so the ORM never sees it
+SYNC_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION faq_api_sync_embedding_vector() RETURNS trigger AS $$
+BEGIN
+    IF NEW.embedding IS NOT NULL AND cardinality(NEW.embedding) = {dim} THEN
+        NEW.embedding_vector := NEW.embedding::halfvec;
+    ELSE
+        NEW.embedding_vector := NULL;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+INSTALL_SQL = [
+    "ALTER TABLE {table} ADD COLUMN IF NOT EXISTS embedding_vector halfvec({dim})",
+    "DROP TRIGGER IF EXISTS sync_embedding_vector ON {table}",
+    """
+    CREATE TRIGGER sync_embedding_vector BEFORE INSERT OR UPDATE OF embedding ON {table}
+    FOR EACH ROW EXECUTE FUNCTION faq_api_sync_embedding_vector()
+    """,
+    """
+    UPDATE {table} SET embedding_vector = embedding::halfvec
+    WHERE embedding IS NOT NULL AND embedding_vector IS NULL AND cardinality(embedding) = {dim}
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS {index} ON {table}
+    USING hnsw (embedding_vector halfvec_cosine_ops) WITH (m = 16, ef_construction = 64)
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS sync_embedding_vector ON {table}",
+    "DROP INDEX IF EXISTS {index}",
+    "ALTER TABLE {table} DROP COLUMN IF EXISTS embedding_vector",
+]
+
+
+def vector_enabled():
+    """Whether similarity search uses the HNSW indexes instead of numpy."""
+    return settings.PGVECTOR_ENABLED
+
+
+def pgvector_version():
+    """Version tuple of the pgvector extension available on the server, or None."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT default_version FROM pg_available_extensions WHERE name = 'vector'")
+        row = cursor.fetchone()
+    if not row:
+        return None
+    return tuple(int(part) for part in row[0].split(".") if part.isdigit())
+
+
+def install_vector_schema():
+    """
+    Create the extension, the halfvec columns, their sync triggers and HNSW
+    indexes, and backfill existing embeddings. Idempotent.
+    """
+    dim = int(settings.EMBEDDING_DIM)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        cursor.execute(SYNC_FUNCTION_SQL.format(dim=dim))
+        for table, index in VECTOR_TABLES.items():
+            for sql in INSTALL_SQL:
+                cursor.execute(sql.format(table=table, index=index, dim=dim))
+
+
+def drop_vector_schema():
+    """Remove the columns, triggers and indexes again (the extension stays)."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table, index in VECTOR_TABLES.items():
+            for sql in DROP_SQL:
+                cursor.execute(sql.format(table=table, index=index))
+        cursor.execute("DROP FUNCTION IF EXISTS faq_api_sync_embedding_vector()")
+
+
+def vector_literal(embedding):
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
+
+def _set_ef_search(cursor):
+    cursor.execute("SET LOCAL hnsw.ef_search = %s", [settings.PGVECTOR_HNSW_EF_SEARCH])
+
+
+def nearest_faqs_batch(embeddings, k=5, index=None):
+    """
+    Top-k FAQ candidates per embedding, shaped like find_top_faqs_batch
+    ([{"faq_id", "similarity", "faq"}, ...] each): HNSW search in Postgres
+    when pgvector is enabled, otherwise the in-memory FAQ index. FAQ
+    objects come from index.faqs when an index is given.
+    """
+    from faq_api.utils.faq_matcher import find_top_faqs_batch
+
+    if not vector_enabled():
+        return find_top_faqs_batch(embeddings, top_n=k, index=index)
+
+    from faq_api.models import FAQ
+
+    hits = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        _set_ef_search(cursor)
+        for embedding in embeddings:
+            if len(embedding) != settings.EMBEDDING_DIM:
+                hits.append([])
+                continue
+            literal = vector_literal(embedding)
+            cursor.execute(
+                """
+                SELECT id, 1 - (embedding_vector <=> %s::halfvec)
+                FROM faq_api_faq
+                WHERE embedding_vector IS NOT NULL
+                ORDER BY embedding_vector <=> %s::halfvec
+                LIMIT %s
+                """,
+                [literal, literal, k],
+            )
+            hits.append(cursor.fetchall())
+
+    faqs = dict(index.faqs) if index is not None else {}
+    missing = {faq_id for rows in hits for faq_id, _ in rows if faq_id not in faqs}
+    if missing:
+        faqs.update(FAQ.objects.defer("embedding").in_bulk(missing))
+    return [
+        [{"faq_id": faq_id, "similarity": sim, "faq": faqs[faq_id]} for faq_id, sim in rows if faq_id in faqs]
+        for rows in hits
+    ]
+
+
+def nearest_faqs(embedding, k=5, index=None):
+    """Top-k FAQ candidates for one embedding (see nearest_faqs_batch)."""
+    return nearest_faqs_batch([embedding], k=k, index=index)[0]
+
+
+def nearest_messages(embedding, k=10, exclude_ids=()):
+    """
+    Nearest messages to an embedding, as [{"message_id", "text",
+    "created_at", "similarity"}, ...]. Runs inside Postgres when pgvector is
+    enabled; otherwise scores stored vectors in chunks with numpy.
+    """
+    from faq_api.models import Message
+
+    if vector_enabled():
+        if len(embedding) != settings.EMBEDDING_DIM:
+            return []
+        with transaction.atomic(), connection.cursor() as cursor:
+            _set_ef_search(cursor)
+            cursor.execute(
+                """
+                SELECT message_id, text, created_at, 1 - (embedding_vector <=> %s::halfvec)
+                FROM faq_api_message
+                WHERE embedding_vector IS NOT NULL AND NOT (message_id = ANY(%s))
+                ORDER BY embedding_vector <=> %s::halfvec
+                LIMIT %s
+                """,
+                [vector_literal(embedding), list(exclude_ids), vector_literal(embedding), k],
+            )
+            rows = cursor.fetchall()
+        return [
+            {"message_id": message_id, "text": text, "created_at": created_at, "similarity": similarity}
+            for message_id, text, created_at, similarity in rows
+        ]
+
+    queryset = Message.objects.exclude(message_id__in=list(exclude_ids))
+    query = np.asarray(embedding, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    best = []
+    chunk = []
+
+    def score(rows):
+        vecs = np.asarray([r[3] for r in rows], dtype=np.float32)
+        norms = np.linalg.norm(vecs, axis=1)
+        norms[norms == 0] = 1.0
+        sims = (vecs @ query) / norms
+        for row, sim in zip(rows, sims):
+            best.append({"message_id": row[0], "text": row[1], "created_at": row[2], "similarity": float(sim)})
+        best.sort(key=lambda r: r["similarity"], reverse=True)
+        del best[k:]
+
+    rows = queryset.exclude(embedding=None).values_list("message_id", "text", "created_at", "embedding")
+    for row in rows.iterator(chunk_size=2000):
+        if len(row[3]) != len(query):
+            continue
+        chunk.append(row)
+        if len(chunk) >= 2000:
+            score(chunk)
+            chunk = []
+    if chunk:
+        score(chunk)
+    return best
@@ -9,6 +9,7 @@ from datetime import timedelta
 
 from django.conf import settings
 from django.core.cache import cache
+from django.db import DatabaseError
 from django.db.models import Q
 from django.http import HttpResponse
 from django.utils.timezone import now
@@ -24,6 +25,7 @@ from faq_api.serializers import (
     ClusterResultSerializer,
 )
 from faq_api.utils.gpt import GPTFAQAnalyzer
+from faq_api.utils.vector_store import nearest_messages
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +38,25 @@ class MessageViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ["created_at"]
     ordering = ["-created_at"]
 
+    @action(detail=True, methods=["get"], url_path="similar")
+    def similar(self, request, pk=None):
+        message = self.get_object()
+        if message.embedding is None:
+            return Response({"error": "Message has no embedding"}, status=400)
+
+        try:
+            k = int(request.query_params.get("k", 10))
+        except (TypeError, ValueError):
+            return Response({"error": "k must be an integer"}, status=400)
+        k = max(1, min(k, 100))
+
+        try:
+            similar = nearest_messages(message.embedding, k=k, exclude_ids=[message.message_id])
+        except DatabaseError:
+            logger.error("Error fetching similar messages", exc_info=True)
+            return Response({"error": "Similarity search failed"}, status=500)
+        return Response({"message_id": message.message_id, "similar": similar})
+
 
 class FAQViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = FAQ.objects.all()